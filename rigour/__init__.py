@@ -16,15 +16,58 @@ from __future__ import absolute_import
 
 from rigour.errors import (ValidationFailed, ProgrammingError)
 from rigour.util import run_check
+from rigour.containertypes import _locate
+from rigour.compiler import compile
+from rigour.batch import (BatchResult, from_json_many, to_json_many,
+                          iter_from_json_many, iter_to_json_many)
 
-def from_json(t, value):
+def from_json(t, value, limits=None):
+  """Decodes and checks a JSON value as type `t`.
+
+  If `limits` are given, the value is first checked against them.
+  """
+  if limits is not None:
+    limits.enforce(value)
   try:
     rv = t.from_json(value)
   except ValueError as e:
     raise ValidationFailed(e.message)
+  _locate(t, rv)
   run_check(t.check, rv)
   return rv
 
+def from_json_async(t, value, **options):
+  """Returns a coroutine decoding a JSON value, as `rigour.aio.from_json`."""
+  from rigour import aio
+  return aio.from_json(t, value, **options)
+
+def check_async(t, value, **options):
+  """Returns a coroutine checking a value, as `rigour.aio.check`."""
+  from rigour import aio
+  return aio.check(t, value, **options)
+
 def to_json(t, value):
   run_check(t.check, value)
   return t.to_json(value)
+
+def is_valid(t, value):
+  """Returns whether `from_json(t, value)` would succeed.
+
+  Rejecting a value this way is much cheaper than catching the exception
+  from `from_json`, since no exception or error message is constructed.
+  """
+  return compile(t).is_valid(value)
+
+def validate_errors(t, value):
+  """Returns the list of failures for a JSON value, empty if it is valid.
+
+  Failures combined into one message by `from_json` are returned as
+  separate `ValidationFailed` records with their full context.
+  """
+  if is_valid(t, value):
+    return []
+  try:
+    from_json(t, value)
+  except ValidationFailed as e:
+    return e.flatten()
+  return []
@@ -0,0 +1,425 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Decoding and checking in asyncio coroutines. Requires Python 3.5.
+
+`from_json` and `check` here work as `rigour.from_json` and `t.check`,
+but hand control back to the event loop after every `yield_every` values,
+so that a large document does not hold up the other tasks on the loop.
+
+Checkers of constrained types may be `async def` functions here. Rather
+than being awaited one by one, they are started as the document is
+walked and gathered at the end, so that their I/O overlaps. A failure
+found by an ordinary checker is raised at once; the failures of async
+checkers are raised together, as `Object` combines those of its fields.
+Values only count as checked, for skipping later checks, once all their
+async checkers have passed.
+
+The synchronous entry points cannot run async checkers, and raise
+`ProgrammingError` when they meet one. Memoized types, lazy objects and
+types without containers are decoded and checked synchronously, as one
+value each.
+"""
+
+from __future__ import absolute_import
+
+from rigour import context
+from rigour.basetypes import (Constrained, Optional, Secret, _ModifierType,
+                              _subtypes)
+from rigour.containertypes import (Array, FixArray, Map, Object, TaggedUnion,
+                                   TrackedList, Union, _FieldMapping,
+                                   _LazyObject, _ObjectAccessor, _checked_by,
+                                   _locate, _set_checked)
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.limits import Limited
+from rigour.util import run_check
+
+import asyncio
+import inspect
+import weakref
+
+DEFAULT_YIELD_EVERY = 1 << 10
+
+_WALKED_MODIFIERS = (Optional, Secret, Constrained, Limited)
+
+def _is_async(checker):
+  return (inspect.iscoroutinefunction(checker) or
+          inspect.iscoroutinefunction(getattr(checker, "__call__", None)))
+
+# Whether each type can be handed whole to its synchronous methods.
+_synchronous = weakref.WeakKeyDictionary()
+
+# Whether each type has async checkers within it.
+_async = weakref.WeakKeyDictionary()
+
+def _has_async(t):
+  try:
+    return _async[t]
+  except KeyError:
+    pass
+  rv = (isinstance(t, Constrained) and any(_is_async(c) for c in t._checkers)
+        or any(_has_async(u) for u in _subtypes(t)))
+  _async[t] = rv
+  return rv
+
+def _variants(t):
+  if type(t) is TaggedUnion:
+    return list(t._variants.values())
+  return list(t._variants)
+
+def _pick(t, value):
+  """Returns the variant of a union taking `value`, and its path suffix."""
+  if type(t) is TaggedUnion:
+    key, u = t._variant(value)
+    return u, t._suffix(key)
+  u = t._variant(value)
+  return u, t._suffix(u)
+
+def _is_synchronous(t):
+  """Returns whether `t` has neither async checkers nor containers."""
+  try:
+    return _synchronous[t]
+  except KeyError:
+    pass
+  u = t
+  while type(u) in _WALKED_MODIFIERS:
+    u = u._t
+  if type(u) in (TaggedUnion, Union):
+    rv = (all(_is_synchronous(v) for v in _variants(u)) and
+          not _has_async(t))
+  else:
+    rv = not (type(u) in (Array, FixArray, Map) or
+              type(u) is Object and not u._lazy) and not _has_async(t)
+  _synchronous[t] = rv
+  return rv
+
+class _Walker(object):
+  def __init__(self, yield_every):
+    self._yield_every = yield_every
+    self._count = 0
+    self._path = []
+    self._secret = 0
+    # Started async checks, as (path, secret, value, awaitable).
+    self._pending = []
+    # Values to mark as checked once the async checks have passed.
+    self._checked = []
+
+  async def _pause(self):
+    self._count = 0
+    await asyncio.sleep(0)
+
+  async def decode(self, t, value):
+    self._count += 1
+    if self._count >= self._yield_every:
+      await self._pause()
+    if value is None and not t.is_required():
+      return None
+    if type(t) is Limited:
+      t._limits.enforce(value)
+    if type(t) in _WALKED_MODIFIERS:
+      return await self.decode(t._t, value)
+    if type(t) is Array:
+      return await self.decode_array(t, value)
+    if type(t) is FixArray:
+      return await self.decode_fixarray(t, value)
+    if type(t) is Map:
+      return await self.decode_map(t, value)
+    if type(t) in (TaggedUnion, Union):
+      u, suffix = _pick(t, value)
+      try:
+        return await self.decode(u, value)
+      except ValidationFailed as e:
+        context.prepend(e, suffix)
+        raise
+    if type(t) is Object and not t._lazy:
+      return await self.decode_object(t, value)
+    return t.from_json(value)
+
+  async def decode_array(self, t, value):
+    rv = []
+    try:
+      if _is_synchronous(t._t):
+        from_json = t._t.from_json
+        for x in value:
+          rv.append(from_json(x))
+          self._count += 1
+          if self._count >= self._yield_every:
+            await self._pause()
+      else:
+        for x in value:
+          rv.append(await self.decode(t._t, x))
+    except ValidationFailed as e:
+      context.prepend(e, len(rv))
+      raise
+    return TrackedList(rv)
+
+  async def decode_fixarray(self, t, value):
+    if len(value) != len(t._fields):
+      message = "expected {} elements, got {}".format(
+        len(t._fields), len(value))
+      raise ValidationFailed(message)
+    rv = []
+    try:
+      for ft, x in zip(t._fields, value):
+        rv.append(await self.decode(ft, x))
+    except ValidationFailed as e:
+      context.prepend(e, len(rv))
+      raise
+    return TrackedList(rv)
+
+  async def decode_map(self, t, value):
+    if not isinstance(value, dict):
+      raise ValidationFailed("expected Object")
+    rv = {}
+    try:
+      for k, x in value.items():
+        try:
+          key = await self.decode(t._key, k)
+        except ValidationFailed as e:
+          e.message = "invalid key: " + e.message
+          raise
+        rv[key] = await self.decode(t._t, x)
+    except ValidationFailed as e:
+      context.prepend(e, k)
+      raise
+    return rv
+
+  async def decode_object(self, t, value):
+    for name in value:
+      if name not in t._fields:
+        raise ValidationFailed("unexpected field '{}'".format(name))
+    d = {}
+    try:
+      for name, ft in t._fields.items():
+        d[name] = await self.decode(ft, value.get(name))
+    except ValidationFailed as e:
+      context.prepend(e, name)
+      raise
+    return t._make_accessor(d)
+
+  async def check(self, t, value):
+    """Checks a value as `run_check(t.check, value)` does."""
+    self._count += 1
+    if self._count >= self._yield_every:
+      await self._pause()
+    if value is None:
+      if not t.is_required():
+        return
+      raise ValidationFailed("missing")
+    secret = t.is_secret()
+    self._secret += secret
+    try:
+      await self._check(t, value)
+    except ValidationFailed as e:
+      if e.value is None:
+        e.value = value
+      if secret:
+        e.secret = True
+      raise
+    finally:
+      self._secret -= secret
+
+  async def _check(self, t, value):
+    if type(t) is Constrained:
+      for checker in t._checkers:
+        self.run_checker(checker, value)
+      await self.check(t._t, value)
+    elif isinstance(t, _ModifierType):
+      await self.check(t._t, value)
+    elif type(t) is Array:
+      await self.check_array(t, value)
+    elif type(t) is FixArray:
+      await self.check_fixarray(t, value)
+    elif type(t) is Map:
+      await self.check_map(t, value)
+    elif type(t) in (TaggedUnion, Union):
+      await self.check_union(t, value)
+    elif type(t) is Object and not _has_async(t) and _checked_by(value) is t:
+      # Checked before, so the synchronous check only looks at changes.
+      run_check(t.check, value)
+    elif type(t) is Object:
+      await self.check_object(t, value)
+    else:
+      run_check(t.check, value)
+
+  def run_checker(self, checker, value):
+    """Runs a checker, starting it if it is async."""
+    if not _is_async(checker):
+      run_check(checker, value)
+      return
+    awaitable = checker(value)
+    # Checks of different values overlap, so each needs its own task.
+    if inspect.iscoroutine(awaitable):
+      awaitable = asyncio.ensure_future(awaitable)
+    self._pending.append((list(self._path), self._secret > 0, value,
+                          awaitable))
+
+  async def check_array(self, t, value):
+    if t._immutable and _checked_by(value) is t:
+      return
+    synchronous = _is_synchronous(t._t)
+    check = t._t.check
+    try:
+      for i, x in enumerate(value):
+        if synchronous:
+          run_check(check, x)
+          self._count += 1
+          if self._count >= self._yield_every:
+            await self._pause()
+        else:
+          self._path.append(i)
+          try:
+            await self.check(t._t, x)
+          finally:
+            self._path.pop()
+    except ValidationFailed as e:
+      context.prepend(e, i)
+      raise
+    if type(value) is TrackedList:
+      self._checked.append((value, t))
+
+  async def check_fixarray(self, t, value):
+    if len(value) != len(t._fields):
+      msg = "expected {} elements, got {}".format(len(t._fields), len(value))
+      raise ValidationFailed(msg, value=value)
+    try:
+      for i, (ft, x) in enumerate(zip(t._fields, value)):
+        self._path.append(i)
+        try:
+          await self.check(ft, x)
+        finally:
+          self._path.pop()
+    except ValidationFailed as e:
+      context.prepend(e, i)
+      raise
+    if type(value) is TrackedList:
+      self._checked.append((value, t))
+
+  async def check_map(self, t, value):
+    if not isinstance(value, dict):
+      raise ValidationFailed("expected Object")
+    try:
+      for k, x in value.items():
+        self._path.append(t._json_key(k))
+        try:
+          try:
+            await self.check(t._key, k)
+          except ValidationFailed as e:
+            e.message = "invalid key: " + e.message
+            raise
+          await self.check(t._t, x)
+        finally:
+          key = self._path.pop()
+    except ValidationFailed as e:
+      context.prepend(e, key)
+      raise
+
+  async def check_union(self, t, value):
+    u, suffix = _pick(t, value)
+    self._path.append(suffix)
+    try:
+      await self.check(u, value)
+    except ValidationFailed as e:
+      context.prepend(e, suffix)
+      raise
+    finally:
+      self._path.pop()
+
+  async def check_object(self, t, value):
+    fields = t._fields.items()
+    if isinstance(value, _LazyObject):
+      pending = value._pending()
+      fields = [(name, ft) for (name, ft) in fields if name not in pending]
+    reasons = []
+    for name, ft in fields:
+      subvalue = value.get(name)
+      self._path.append(name)
+      try:
+        await self.check(ft, subvalue)
+      except ValidationFailed as e:
+        context.prepend(e, name)
+        if subvalue is None:
+          reasons.append(ValidationFailed("missing field '{}'".format(name)))
+        else:
+          reasons.append(e)
+      finally:
+        self._path.pop()
+    accessor = isinstance(value, (_ObjectAccessor, _FieldMapping))
+    for name in () if accessor else getattr(value, "__dict__", ()):
+      if name not in t._fields:
+        reasons.append(ValidationFailed("unexpected field '{}'".format(name)))
+    _raise(reasons)
+    if accessor and value._object is t:
+      self._checked.append((value, t))
+
+  async def finish(self):
+    """Waits for the async checks, raising their failures."""
+    pending, self._pending = self._pending, []
+    results = await asyncio.gather(*[p[3] for p in pending],
+                                   return_exceptions=True)
+    reasons = []
+    for (path, secret, value, awaitable), rv in zip(pending, results):
+      if isinstance(rv, ValidationFailed):
+        rv.context[:0] = path
+        if rv.value is None:
+          rv.value = value
+        if secret:
+          rv.secret = True
+        reasons.append(rv)
+      elif isinstance(rv, BaseException):
+        raise rv
+      elif rv is not None:
+        message = "checker should not be returning a value, but returned {}"
+        raise ProgrammingError(message.format(rv))
+    _raise(reasons)
+    for value, t in self._checked:
+      _set_checked(value, t)
+      if not isinstance(value, TrackedList):
+        object.__setattr__(value, "_dirty", None)
+
+  def cancel(self):
+    for _, _, _, awaitable in self._pending:
+      if isinstance(awaitable, asyncio.Future):
+        awaitable.cancel()
+    self._pending = []
+
+def _raise(reasons):
+  if len(reasons) == 1:
+    raise reasons[0]
+  elif reasons:
+    raise ValidationFailed(", ".join(r.format() for r in reasons),
+                           reasons=reasons)
+
+async def from_json(t, value, yield_every=DEFAULT_YIELD_EVERY, limits=None):
+  """Decodes and checks a JSON value, as `rigour.from_json`."""
+  if limits is not None:
+    limits.enforce(value)
+  walker = _Walker(yield_every)
+  rv = await walker.decode(t, value)
+  _locate(t, rv)
+  try:
+    await walker.check(t, rv)
+    await walker.finish()
+  finally:
+    walker.cancel()
+  return rv
+
+async def check(t, value, yield_every=DEFAULT_YIELD_EVERY):
+  """Checks a value, as `t.check`."""
+  walker = _Walker(yield_every)
+  try:
+    await walker.check(t, value)
+    await walker.finish()
+  finally:
+    walker.cancel()
@@ -14,8 +14,12 @@
 
 from __future__ import absolute_import
 
-from rigour.util import run_check
-from rigour.errors import ValidationFailed
+from rigour.util import run_check, LRUCache
+from rigour.errors import ProgrammingError, ValidationFailed
+
+import copy
+import hashlib
+import json
 
 class JsonType(object):
   def _name(self, depth):
@@ -39,6 +43,20 @@ class JsonType(object):
   def secret(self):
     return Secret(self)
 
+  def memoized(self, maxsize=1024, copy=False):
+    return Memoized(self, maxsize, copy)
+
+  def limited(self, limits=None):
+    """Returns this type, rejecting JSON input over `limits` up front.
+
+    By default the limits are derived from this type, as by
+    `Limits.derived`.
+    """
+    from rigour.limits import Limited, Limits
+    if limits is None:
+      limits = Limits.derived(self)
+    return Limited(self, limits)
+
   def name(self, depth):
     return self._name(depth)
 
@@ -52,6 +70,12 @@ class JsonType(object):
       return None
     return self._from_json(value)
 
+  def __getstate__(self):
+    state = dict(self.__dict__)
+    for name in _CACHES:
+      state.pop(name, None)
+    return state
+
   def check(self, value):
     if value is None:
       if not self.is_required():
@@ -64,6 +88,28 @@ class JsonType(object):
         e.secret = True
       raise
 
+# Attributes caching things built from a type, such as its compiled
+# decoder. They are kept on the type rather than in a global table keyed
+# by it, since they refer back to the type and would keep it alive.
+_CACHES = ("_compiled_schema", "_json_encoder")
+
+# The number of active profilers. While there are any, types carry the
+# profiler's hooks, so nothing built from them is cached.
+_profiling = 0
+
+def _cached(t, name, make):
+  """Returns the cached attribute `name` of `t`, made by `make(t)`."""
+  rv = t.__dict__.get(name)
+  if rv is None:
+    rv = make(t)
+    if not _profiling:
+      setattr(t, name, rv)
+  return rv
+
+def _uncache(t):
+  for name in _CACHES:
+    t.__dict__.pop(name, None)
+
 class _ModifierType(JsonType):
   def __init__(self, t):
     self._t = t
@@ -95,6 +141,8 @@ class Optional(_ModifierType):
 
 class Secret(_ModifierType):
   def __init__(self, t):
+    if _contains(t, Memoized):
+      raise ProgrammingError("cannot make a memoized type secret")
     _ModifierType.__init__(self, t)
 
   def is_secret(self):
@@ -114,3 +162,83 @@ class Constrained(_ModifierType):
           e.value = value
         raise
     _ModifierType._check(self, value)
+
+def _subtypes(t):
+  """Returns the types directly contained in a type."""
+  rv = []
+  for name in ("_key", "_t", "_object"):
+    u = getattr(t, name, None)
+    if isinstance(u, JsonType):
+      rv.append(u)
+  for name in ("_fields", "_variants"):
+    fields = getattr(t, name, ())
+    if isinstance(fields, dict):
+      fields = fields.values()
+    rv.extend(u for u in fields if isinstance(u, JsonType))
+  return rv
+
+def _contains(t, cls):
+  """Returns whether a type is or contains an instance of `cls`."""
+  return isinstance(t, cls) or any(_contains(u, cls) for u in _subtypes(t))
+
+def _canonical_key(value):
+  text = json.dumps(value, sort_keys=True, separators=(",", ":"))
+  return hashlib.sha256(text.encode("utf-8")).digest()
+
+class Memoized(_ModifierType):
+  """Caches decoded values by the content of their JSON.
+
+  A JSON value seen before is not decoded or checked again; the decoded
+  value from the first time is returned instead. By default it is shared
+  between all the places that decoded the same JSON, and so must not be
+  modified. With `copy`, a deep copy is returned each time. Checking a
+  shared value again costs little, as objects and arrays remember being
+  checked, and still catches changes made to it. A shared value found
+  to have been changed is not returned again, but replaced by a new one;
+  values that cannot record their changes, such as those of a `Map`, are
+  decoded afresh each time.
+
+  At most `maxsize` values are kept, evicting the least recently used.
+  Keys are digests of the canonical JSON text. Types containing secrets
+  cannot be memoized, since the cache would keep their decoded values.
+  """
+
+  def __init__(self, t, maxsize=1024, copy=False):
+    if _contains(t, Secret):
+      raise ProgrammingError("cannot memoize a type containing secrets")
+    _ModifierType.__init__(self, t)
+    self._copy = copy
+    self._cache = LRUCache(maxsize)
+
+  def _from_json(self, json_value):
+    try:
+      key = _canonical_key(json_value)
+    except (TypeError, ValueError):
+      return self._t.from_json(json_value)
+    rv = self._cache.get(key, _MISSING)
+    if rv is not _MISSING and not self._copy:
+      from rigour.containertypes import _unchanged
+      if not _unchanged(rv):
+        # Changed by one of the places sharing it, so decoded afresh.
+        rv = _MISSING
+    if rv is _MISSING:
+      rv = self._t.from_json(json_value)
+      run_check(self._t.check, rv)
+      self._cache.put(key, rv)
+    if self._copy:
+      return copy.deepcopy(rv)
+    return rv
+
+  def stats(self):
+    """Returns the hit, miss and eviction counts and size of the cache."""
+    return self._cache.stats()
+
+  def clear(self):
+    self._cache.clear()
+
+  def __getstate__(self):
+    state = JsonType.__getstate__(self)
+    state["_cache"] = LRUCache(self._cache.maxsize)
+    return state
+
+_MISSING = object()
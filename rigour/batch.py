@@ -0,0 +1,78 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.compiler import compile
+from rigour.errors import ValidationFailed
+from rigour.util import run_check
+
+import collections
+
+BatchResult = collections.namedtuple("BatchResult", ["values", "errors"])
+BatchResult.__doc__ = """The outcome of converting a batch of values.
+
+`values` holds one result per input, with None in place of each value
+that failed. `errors` holds an (index, ValidationFailed) pair for each
+of those, in input order.
+"""
+
+def iter_from_json_many(t, values):
+  """Decodes and validates JSON values, yielding (index, value, error).
+
+  Exactly one of `value` and `error` is meaningful for each item: `error`
+  is None for values that succeeded. A failing item does not stop the
+  batch.
+  """
+  from_json = compile(t).from_json
+  for i, value in enumerate(values):
+    try:
+      rv = from_json(value)
+    except ValidationFailed as e:
+      yield i, None, e
+    else:
+      yield i, rv, None
+
+def iter_to_json_many(t, values):
+  """Validates and encodes values, yielding (index, json_value, error)."""
+  check = t.check
+  to_json = t.to_json
+  for i, value in enumerate(values):
+    try:
+      run_check(check, value)
+    except ValidationFailed as e:
+      yield i, None, e
+    else:
+      yield i, to_json(value), None
+
+def _collect(results):
+  values = []
+  errors = []
+  for i, value, error in results:
+    values.append(value)
+    if error is not None:
+      errors.append((i, error))
+  return BatchResult(values, errors)
+
+def from_json_many(t, values):
+  """Decodes and validates a batch of JSON values into a `BatchResult`.
+
+  The type is compiled once for the whole batch, and each invalid value
+  is reported in the result rather than aborting the batch.
+  """
+  return _collect(iter_from_json_many(t, values))
+
+def to_json_many(t, values):
+  """Validates and encodes a batch of values into a `BatchResult`."""
+  return _collect(iter_to_json_many(t, values))
@@ -0,0 +1,202 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.basetypes import JsonType
+from rigour.containertypes import Object
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.util import run_check
+from rigour.valuetypes import (_SimpleType, String, Integer, Float,
+                               StringEnum, Any)
+
+from rigour import compiler
+from rigour import context
+
+import array
+import sys
+
+if sys.version_info.major == 2:
+  _INTEGER_CODE = "l"
+else:
+  _INTEGER_CODE = "q"
+
+class Columns(object):
+  """The columns decoded from an array of objects by a `ColumnarArray`.
+
+  Each field is available as an attribute or item. Integer and Float
+  fields, and StringEnum fields decoding to codes, are held in
+  `array.array`s, and other fields in lists, with String and StringEnum
+  values interned. An Integer column holding values too large for the
+  array is a list instead. For optional fields, `nulls` maps the field
+  name to a bytearray with a 1 for each row where the field was null;
+  numeric columns hold a 0 in those rows.
+
+  Columns are meant to be read-only. Those produced by decoding have
+  already been validated, and are not checked again on encoding.
+  """
+
+  def __init__(self, t, length, columns, nulls, validated=False):
+    self._object = t
+    self._length = length
+    self._columns = columns
+    self._validated = validated
+    self.nulls = nulls
+
+  def __len__(self):
+    return self._length
+
+  def __getitem__(self, name):
+    return self._columns[name]
+
+  def __getattr__(self, name):
+    try:
+      return self.__dict__["_columns"][name]
+    except KeyError:
+      raise AttributeError("no such column: " + name)
+
+  def names(self):
+    return list(self._columns)
+
+  def row(self, i):
+    """Returns row `i` as a value of the element `Object` type."""
+    d = {}
+    for name, column in self._columns.items():
+      nulls = self.nulls.get(name)
+      d[name] = None if nulls is not None and nulls[i] else column[i]
+    return self._object._make_accessor(d)
+
+  def __iter__(self):
+    for i in range(self._length):
+      yield self.row(i)
+
+  def __repr__(self):
+    return "[Columns: {} rows of {}]".format(self._length,
+                                              self._object.name(1))
+
+class _Column(object):
+  def __init__(self, name, t):
+    self.name = name
+    self.type = t
+    self.optional = not t.is_required()
+    # Whether values go through the compiled field type. It is compiled
+    # when decoding, so that columns can be pickled.
+    self.decodes = False
+    self.interned = None
+    self.typecode = None
+    _, base = compiler._unwrap(t)
+    if type(base) is Integer:
+      self.typecode = _INTEGER_CODE
+    elif type(base) is Float:
+      self.typecode = "d"
+    elif type(base) is StringEnum and base._codes:
+      self.typecode = "B" if len(base._choices) <= 256 else _INTEGER_CODE
+      self.decodes = True
+    elif type(base) is StringEnum and base._ignore_case:
+      self.decodes = True
+    elif type(base) is StringEnum:
+      self.interned = dict(base._index)
+    elif type(base) is String:
+      self.interned = {}
+    elif type(base) not in (_SimpleType, Any):
+      # Values that are not decoded as-is go through the field type.
+      self.decodes = True
+
+  def empty(self):
+    if self.typecode is not None:
+      return array.array(self.typecode)
+    return []
+
+class ColumnarArray(JsonType):
+  """An `Array` of `Object`s decoded into columns rather than rows.
+
+  Decoding produces a `Columns` value with one compact column per field,
+  which avoids allocating an accessor per row. All checks of the element
+  type, including constraints, still run for each row, and errors carry
+  the same paths as for the plain `Array`.
+  """
+
+  def __init__(self, t):
+    if type(t) is not Object:
+      raise ProgrammingError("expected an Array of Object, got " + t.name(1))
+    self._object = t
+    self._columns = [_Column(name, ft) for (name, ft) in t._fields.items()]
+
+  def _name(self, depth):
+    return "[" + self._object.name(depth) + "..]"
+
+  def _from_json(self, value):
+    compiled = compiler.compile(self._object)
+    is_valid = compiled.is_valid
+    columns = {}
+    nulls = {}
+    plan = []
+    for c in self._columns:
+      column = columns[c.name] = c.empty()
+      mask = None
+      if c.optional:
+        mask = nulls[c.name] = bytearray()
+      # Interning tables live for one decode, so that strings from earlier
+      # values are not retained.
+      interned = dict(c.interned) if c.interned is not None else None
+      placeholder = 0 if c.typecode is not None else None
+      decode = compiler.compile(c.type).from_json if c.decodes else None
+      plan.append([c.name, column.append, mask, placeholder, decode,
+                   interned])
+    length = 0
+    for i, row in enumerate(value):
+      if not is_valid(row):
+        with context.index(i):
+          compiled.from_json(row)
+      for entry in plan:
+        name, append, mask, placeholder, decode, interned = entry
+        x = row.get(name)
+        if mask is not None:
+          if x is None:
+            mask.append(1)
+            append(placeholder)
+            continue
+          mask.append(0)
+        if decode is not None:
+          x = decode(x)
+        elif interned is not None:
+          x = interned.setdefault(x, x)
+        try:
+          append(x)
+        except OverflowError:
+          # Numbers too large for the array go in a list instead.
+          column = columns[name] = list(columns[name])
+          column.append(x)
+          entry[1] = column.append
+      length += 1
+    return Columns(self._object, length, columns, nulls, validated=True)
+
+  def _check(self, value):
+    if not isinstance(value, Columns) or (
+        set(value.names()) != set(self._object._fields)):
+      raise ValidationFailed("expected columns of " + self._object.name(1))
+    # Columns decoded by an equal type, such as one that was pickled
+    # along with them, are checked again.
+    if value._validated and value._object is self._object:
+      return
+    check = self._object.check
+    try:
+      for i, row in enumerate(value):
+        run_check(check, row)
+    except ValidationFailed as e:
+      context.prepend(e, i)
+      raise
+
+  def _to_json(self, value):
+    return [self._object.to_json(row) for row in value]
@@ -0,0 +1,383 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compiles a schema into a single generated decode-and-validate function.
+
+The interpreted path (`rigour.from_json`) walks the type tree twice, once
+to decode and once to check, dispatching through several layers of
+methods per node. `compile` instead flattens the tree into Python source
+with the type checks inlined, and `exec`s it once.
+
+The generated function only answers "valid or not" on its own. When it
+rejects a value, the interpreted path is run on the same input to raise
+the error, so error messages are identical to those of `rigour.from_json`.
+"""
+
+from __future__ import absolute_import
+
+from rigour.basetypes import Optional, Secret, Constrained, _cached
+from rigour.constraints import Constraint
+from rigour.containertypes import (Array, FixArray, Object, TaggedUnion,
+                                   _locate, _make_checked_list)
+from rigour.errors import ProgrammingError
+from rigour.limits import Limited
+from rigour.util import _returned
+from rigour.valuetypes import (_SimpleType, String, Integer, Float,
+                               StringEnum, Datetime, Date, Any)
+
+import rigour
+
+_builtin_compile = compile
+
+_MODIFIER_TYPES = (Optional, Secret, Constrained)
+_SIMPLE_TYPES = (_SimpleType, String, Integer, Float)
+_KNOWN_TYPES = _SIMPLE_TYPES + (StringEnum, Datetime, Date, Any,
+                                Object, Array, FixArray, TaggedUnion, Limited)
+
+# Deeper than this, containers are emitted as separate functions to stay
+# clear of Python's limit on statically nested blocks.
+_MAX_INLINE_DEPTH = 8
+
+class _Invalid(object):
+  def __repr__(self):
+    return "<invalid>"
+
+INVALID = _Invalid()
+
+def _unwrap(t):
+  """Splits a type into its chain of modifiers and the type they wrap."""
+  checkers = []
+  while type(t) in _MODIFIER_TYPES:
+    if type(t) is Constrained:
+      checkers.extend(t._checkers)
+    t = t._t
+  return checkers, t
+
+class _Generator(object):
+  def __init__(self):
+    self._namespace = {
+      "INVALID": INVALID,
+      "ProgrammingError": ProgrammingError,
+      "_returned": _returned,
+    }
+    self._functions = []
+    self._counter = 0
+    # Dicts of emitted functions, filled in once they are loaded.
+    self._dispatch = []
+
+  def constant(self, value, prefix="c"):
+    name = self.variable(prefix)
+    self._namespace[name] = value
+    return name
+
+  def variable(self, prefix):
+    self._counter += 1
+    return "{}{}".format(prefix, self._counter)
+
+  def function(self, t, build):
+    """Emits a function decoding and validating a value of type `t`.
+
+    If `build` is false the function only validates, and returns None
+    rather than the decoded value when the value is valid.
+    """
+    name = self.variable("_decode" if build else "_validate")
+    lines = ["def {}(x):".format(name)]
+    result = self.emit(t, "x", lines, 1, build)
+    lines.append("  return {}".format(result if build else "None"))
+    self._functions.append("\n".join(lines))
+    return name
+
+  def source(self):
+    return "\n\n".join(reversed(self._functions)) + "\n"
+
+  def load(self):
+    namespace = dict(self._namespace)
+    code = _builtin_compile(self.source(), "<rigour.compile>", "exec")
+    exec(code, namespace)
+    for d, functions in self._dispatch:
+      d.update((key, namespace[name]) for key, name in functions.items())
+    return namespace
+
+  def emit(self, t, x, lines, depth, build):
+    """Emits code decoding and validating the expression `x` as type `t`.
+
+    The emitted code returns INVALID from the enclosing function if the
+    value is rejected, and otherwise leaves the decoded value in the
+    variable whose name is returned. If `build` is false the decoded
+    value is not needed, and containers only build it for their checkers.
+    """
+    pad = "  " * depth
+    y = self.variable("y")
+    if type(t) not in _MODIFIER_TYPES + _KNOWN_TYPES:
+      self.emit_opaque(t, x, y, lines, depth)
+      return y
+    checkers, base = _unwrap(t)
+    lines.append("{}if {} is None:".format(pad, x))
+    if t.is_required():
+      lines.append("{}  return INVALID".format(pad))
+    else:
+      lines.append("{}  {} = None".format(pad, y))
+    lines.append("{}else:".format(pad))
+    self.emit_base(base, x, y, lines, depth + 1, build or bool(checkers))
+    self.emit_checkers(checkers, y, lines, depth + 1)
+    return y
+
+  def emit_opaque(self, t, x, y, lines, depth):
+    """Emits a call through the type's public interface."""
+    pad = "  " * depth
+    n = self.constant(t, "t")
+    lines.extend([
+      "{}try:".format(pad),
+      "{}  {} = {}.from_json({})".format(pad, y, n, x),
+      "{}  r = {}.check({})".format(pad, n, y),
+      "{}except ProgrammingError:".format(pad),
+      "{}  raise".format(pad),
+      "{}except Exception:".format(pad),
+      "{}  return INVALID".format(pad),
+      "{}if r is not None:".format(pad),
+      "{}  _returned({}.check, r)".format(pad, n),
+    ])
+
+  def emit_checkers(self, checkers, y, lines, depth):
+    """Emits the checkers of a value, fusing runs of `Constraint`s.
+
+    Each run of consecutive constraints becomes a single inline test,
+    with duplicates dropped.
+    """
+    run = []
+    for checker in checkers + [None]:
+      if isinstance(checker, Constraint):
+        if checker not in run:
+          run.append(checker)
+        continue
+      if run:
+        self.emit_constraints(run, y, lines, depth)
+        run = []
+      if checker is not None:
+        self.emit_checker(checker, y, lines, depth)
+
+  def emit_constraints(self, constraints, y, lines, depth):
+    pad = "  " * depth
+    tests = " and ".join("({})".format(c._expression(y, self.constant))
+                         for c in constraints)
+    lines.extend([
+      "{}try:".format(pad),
+      "{}  r = {}".format(pad, tests),
+      "{}except Exception:".format(pad),
+      "{}  r = False".format(pad),
+      "{}if not r:".format(pad),
+      "{}  return INVALID".format(pad),
+    ])
+
+  def emit_checker(self, checker, y, lines, depth):
+    pad = "  " * depth
+    n = self.constant(checker, "f")
+    lines.extend([
+      "{}try:".format(pad),
+      "{}  r = {}({})".format(pad, n, y),
+      "{}except ProgrammingError:".format(pad),
+      "{}  raise".format(pad),
+      "{}except Exception:".format(pad),
+      "{}  return INVALID".format(pad),
+      "{}if r is not None:".format(pad),
+      "{}  _returned({}, r)".format(pad, n),
+    ])
+
+  def emit_base(self, t, x, y, lines, depth, build):
+    """Emits code for a non-None value of an unwrapped type."""
+    pad = "  " * depth
+    if type(t) in _SIMPLE_TYPES:
+      n = self.constant(t._python_type, "T")
+      lines.extend([
+        "{}if not isinstance({}, {}):".format(pad, x, n),
+        "{}  return INVALID".format(pad),
+      ])
+      if type(t) is String and t._interned is not None:
+        f = self.constant(t._interned.intern, "i")
+        lines.append("{}{} = {}({})".format(pad, y, f, x))
+      else:
+        lines.append("{}{} = {}".format(pad, y, x))
+    elif type(t) is StringEnum and not t._ignore_case:
+      n = self.constant(t._index, "C")
+      lines.extend([
+        "{}if {}.__class__ in (list, dict):".format(pad, x),
+        "{}  return INVALID".format(pad),
+        "{}{} = {}.get({}, INVALID)".format(pad, y, n, x),
+        "{}if {} is INVALID:".format(pad, y),
+        "{}  return INVALID".format(pad),
+      ])
+    elif type(t) is Any:
+      lines.append("{}{} = {}".format(pad, y, x))
+    elif type(t) is Object and t._lazy:
+      self.emit_opaque(t, x, y, lines, depth)
+    elif type(t) in (Object, Array, FixArray):
+      if depth > _MAX_INLINE_DEPTH:
+        f = self.function(t, build)
+        lines.extend([
+          "{}{} = {}({})".format(pad, y, f, x),
+          "{}if {} is INVALID:".format(pad, y),
+          "{}  return INVALID".format(pad),
+        ])
+      else:
+        emit = getattr(self, "emit_" + type(t).__name__.lower())
+        emit(t, x, y, lines, depth, build)
+    elif type(t) in (StringEnum, Datetime, Date):
+      self.emit_leaf(t, x, y, lines, depth)
+    elif type(t) is TaggedUnion:
+      self.emit_taggedunion(t, x, y, lines, depth, build)
+    elif type(t) is Limited:
+      n = self.constant(t._limits.within, "l")
+      lines.extend([
+        "{}if not {}({}):".format(pad, n, x),
+        "{}  return INVALID".format(pad),
+      ])
+      v = self.emit(t._t, x, lines, depth, build)
+      if build:
+        lines.append("{}{} = {}".format(pad, y, v))
+    else:
+      self.emit_opaque(t, x, y, lines, depth)
+
+  def emit_leaf(self, t, x, y, lines, depth):
+    """Emits calls to the private decode and check steps of a leaf type."""
+    pad = "  " * depth
+    n = self.constant(t, "t")
+    lines.extend([
+      "{}try:".format(pad),
+      "{}  {} = {}._from_json({})".format(pad, y, n, x),
+      "{}  {}._check({})".format(pad, n, y),
+      "{}except ProgrammingError:".format(pad),
+      "{}  raise".format(pad),
+      "{}except Exception:".format(pad),
+      "{}  return INVALID".format(pad),
+    ])
+
+  def emit_fallback(self, t, x, y, lines, depth):
+    """Emits the interpreted path for input of an unexpected shape."""
+    lines.append("{}else:".format("  " * depth))
+    self.emit_leaf(t, x, y, lines, depth + 1)
+
+  def emit_array(self, t, x, y, lines, depth, build):
+    pad = "  " * depth
+    e = self.variable("e")
+    a = self.variable("a")
+    lines.append("{}if {}.__class__ is list:".format(pad, x))
+    if build:
+      lines.extend([
+        "{}  {} = []".format(pad, y),
+        "{}  {} = {}.append".format(pad, a, y),
+      ])
+    lines.append("{}  for {} in {}:".format(pad, e, x))
+    v = self.emit(t._t, e, lines, depth + 2, build)
+    if build:
+      make = self.constant(_make_checked_list, "m")
+      n = self.constant(t, "t")
+      lines.extend([
+        "{}    {}({})".format(pad, a, v),
+        "{}  {} = {}({}, {})".format(pad, y, make, y, n),
+      ])
+    self.emit_fallback(t, x, y, lines, depth)
+
+  def emit_fixarray(self, t, x, y, lines, depth, build):
+    pad = "  " * depth
+    lines.append("{}if {}.__class__ is list and len({}) == {}:".format(
+      pad, x, x, len(t._fields)))
+    values = []
+    for i, field in enumerate(t._fields):
+      e = self.variable("e")
+      lines.append("{}  {} = {}[{}]".format(pad, e, x, i))
+      values.append(self.emit(field, e, lines, depth + 1, build))
+    if build:
+      make = self.constant(_make_checked_list, "m")
+      n = self.constant(t, "t")
+      lines.append("{}  {} = {}([{}], {})".format(pad, y, make,
+                                                 ", ".join(values), n))
+    self.emit_fallback(t, x, y, lines, depth)
+
+  def emit_object(self, t, x, y, lines, depth, build):
+    pad = "  " * depth
+    names = self.constant(frozenset(t._fields), "K")
+    make = self.constant(t._make_checked_accessor, "m")
+    lines.extend([
+      "{}if {}.__class__ is dict:".format(pad, x),
+      "{}  if not {}.issuperset({}):".format(pad, names, x),
+      "{}    return INVALID".format(pad),
+    ])
+    values = []
+    for name, field in t._fields.items():
+      e = self.variable("e")
+      lines.append("{}  {} = {}.get({!r})".format(pad, e, x, name))
+      values.append((name, self.emit(field, e, lines, depth + 1, build)))
+    if build:
+      items = ", ".join("{!r}: {}".format(n, v) for (n, v) in values)
+      lines.append("{}  {} = {}({{{}}})".format(pad, y, make, items))
+    self.emit_fallback(t, x, y, lines, depth)
+
+  def emit_taggedunion(self, t, x, y, lines, depth, build):
+    """Emits a lookup of the function for the variant by its tag."""
+    pad = "  " * depth
+    functions = {key: self.function(v, build)
+                 for key, v in t._variants.items()}
+    n = self.constant({}, "D")
+    self._dispatch.append((self._namespace[n], functions))
+    f = self.variable("f")
+    lines.extend([
+      "{}if {}.__class__ is not dict:".format(pad, x),
+      "{}  return INVALID".format(pad),
+      "{}try:".format(pad),
+      "{}  {} = {}.get({}.get({!r}))".format(pad, f, n, x, t._tag),
+      "{}except TypeError:".format(pad),
+      "{}  return INVALID".format(pad),
+      "{}if {} is None:".format(pad, f),
+      "{}  return INVALID".format(pad),
+      "{}{} = {}({})".format(pad, y, f, x),
+      "{}if {} is INVALID:".format(pad, y),
+      "{}  return INVALID".format(pad),
+    ])
+
+class CompiledSchema(object):
+  """A schema flattened into a generated decode-and-validate function."""
+
+  def __init__(self, t):
+    self._t = t
+    generator = _Generator()
+    decode = generator.function(t, True)
+    validate = generator.function(t, False)
+    namespace = generator.load()
+    self._decode = namespace[decode]
+    self._validate = namespace[validate]
+    self.source = generator.source()
+
+  def from_json(self, value):
+    """Equivalent to `rigour.from_json(t, value)` for the compiled type."""
+    rv = self._decode(value)
+    if rv is INVALID:
+      return rigour.from_json(self._t, value)
+    _locate(self._t, rv)
+    return rv
+
+  def is_valid(self, value):
+    """Returns whether `from_json` would accept the value.
+
+    No exceptions are raised or messages formatted for invalid values,
+    and containers are only built where a checker needs to see them.
+    """
+    return self._validate(value) is not INVALID
+
+def compile(t):
+  """Compiles a type into a `CompiledSchema`.
+
+  The result is kept on the type, so compiling the same type again is
+  cheap, and it goes away along with the type.
+  """
+  return _cached(t, "_compiled_schema", CompiledSchema)
@@ -12,27 +12,264 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""Constraints for use with `JsonType.constrain`.
+
+Any callable raising `ValidationFailed` will do as a constraint. The
+`Constraint` classes here also expose their parameters, which lets
+`rigour.compile` evaluate them inline, fused into a single test, rather
+than calling each one.
+"""
+
 from __future__ import absolute_import
 
 from rigour.errors import ValidationFailed
 
 import re
 
-def length_between(min_, max_):
-  def f(xs):
-    l = len(xs)
-    if l < min_:
-      message = "too short ({} is below threshold {})".format(l, min_)
-      raise ValidationFailed(message)
-    if l > max_:
-      message = "too long ({} exceeds limit of {})".format(l, max_)
+# Compiled patterns shared between all constraints using the same regex.
+_patterns = {}
+
+def _pattern(regex):
+  rv = _patterns.get(regex)
+  if rv is None:
+    rv = _patterns[regex] = re.compile("^" + regex + "$")
+  return rv
+
+def _literal(value, constant):
+  if type(value) is int:
+    return repr(value)
+  return constant(value)
+
+class Constraint(object):
+  """Base of the declarative constraints.
+
+  Subclasses implement `_valid`, returning whether a value satisfies the
+  constraint, and `_message`, describing why one does not. They may also
+  implement `_expression` to give the compiler an equivalent Python
+  expression to inline. A value that `_valid` cannot handle, such as a
+  string given to a numeric constraint, fails the constraint.
+  """
+
+  def __call__(self, value):
+    try:
+      valid = self._valid(value)
+    except Exception:
+      valid = False
+    if not valid:
+      try:
+        message = self._message(value)
+      except Exception:
+        message = Constraint._message(self, value)
       raise ValidationFailed(message)
-  return f
+
+  def _message(self, value):
+    return "failed {!r}".format(self)
+
+  def _expression(self, x, constant):
+    """Returns a Python expression testing `x` against the constraint.
+
+    `constant` takes a value and returns the name it is bound to in the
+    expression's namespace.
+    """
+    return "{}._valid({})".format(constant(self), x)
+
+  def params(self):
+    """Returns the parameters of the constraint as a tuple.
+
+    Constraints with equal types and parameters are equal. The default of
+    None makes a constraint equal only to itself.
+    """
+    return None
+
+  def __eq__(self, other):
+    if self.params() is None:
+      return self is other
+    return type(self) is type(other) and self.params() == other.params()
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __hash__(self):
+    if self.params() is None:
+      return id(self)
+    return hash((type(self), self.params()))
+
+  def __repr__(self):
+    return "{}({})".format(type(self).__name__,
+                           ", ".join(map(repr, self.params() or ())))
+
+class LengthBetween(Constraint):
+  """Checks that len(value) lies in the closed range [min_, max_]."""
+
+  def __init__(self, min_, max_):
+    self.min = min_
+    self.max = max_
+
+  def params(self):
+    return (self.min, self.max)
+
+  def _valid(self, xs):
+    return self.min <= len(xs) <= self.max
+
+  def _message(self, xs):
+    l = len(xs)
+    if l < self.min:
+      return "too short ({} is below threshold {})".format(l, self.min)
+    return "too long ({} exceeds limit of {})".format(l, self.max)
+
+  def _expression(self, x, constant):
+    return "{} <= len({}) <= {}".format(_literal(self.min, constant), x,
+                                        _literal(self.max, constant))
+
+class NumberBetween(Constraint):
+  """Checks that a number lies in the closed range [min_, max_].
+
+  Either bound may be None, leaving that side open.
+  """
+
+  def __init__(self, min_=None, max_=None):
+    self.min = min_
+    self.max = max_
+
+  def params(self):
+    return (self.min, self.max)
+
+  def _valid(self, x):
+    return ((self.min is None or x >= self.min) and
+            (self.max is None or x <= self.max))
+
+  def _message(self, x):
+    if self.min is not None and x < self.min:
+      return "below minimum {}".format(self.min)
+    return "exceeds maximum {}".format(self.max)
+
+  def _expression(self, x, constant):
+    tests = []
+    if self.min is not None:
+      tests.append("{} >= {}".format(x, _literal(self.min, constant)))
+    if self.max is not None:
+      tests.append("{} <= {}".format(x, _literal(self.max, constant)))
+    return " and ".join(tests) or "True"
+
+class MatchesRegex(Constraint):
+  """Checks that a string matches a regular expression in its entirety."""
+
+  def __init__(self, regex, description=None):
+    self.regex = regex
+    self.description = description
+    self._requirement = description or "string matching '{}'".format(regex)
+    self._compiled = _pattern(regex)
+
+  def params(self):
+    return (self.regex, self.description)
+
+  def _valid(self, s):
+    return self._compiled.match(s) is not None
+
+  def _message(self, s):
+    return "expected {}".format(self._requirement)
+
+  def _expression(self, x, constant):
+    return "{}({}) is not None".format(constant(self._compiled.match), x)
+
+class HasPrefix(Constraint):
+  """Checks that a string starts with `prefix`."""
+
+  def __init__(self, prefix):
+    self.prefix = prefix
+
+  def params(self):
+    return (self.prefix,)
+
+  def _valid(self, s):
+    return s.startswith(self.prefix)
+
+  def _message(self, s):
+    return "expected string starting with '{}'".format(self.prefix)
+
+  def _expression(self, x, constant):
+    return "{}.startswith({})".format(x, constant(self.prefix))
+
+class HasSuffix(Constraint):
+  """Checks that a string ends with `suffix`."""
+
+  def __init__(self, suffix):
+    self.suffix = suffix
+
+  def params(self):
+    return (self.suffix,)
+
+  def _valid(self, s):
+    return s.endswith(self.suffix)
+
+  def _message(self, s):
+    return "expected string ending with '{}'".format(self.suffix)
+
+  def _expression(self, x, constant):
+    return "{}.endswith({})".format(x, constant(self.suffix))
+
+class OneOf(Constraint):
+  """Checks that a value is one of the given hashable choices."""
+
+  def __init__(self, *choices):
+    self.choices = choices
+    self._index = frozenset(choices)
+
+  def params(self):
+    return self.choices
+
+  def _valid(self, x):
+    try:
+      return x in self._index
+    except TypeError:
+      return False
+
+  def _message(self, x):
+    return "expected one of: {}".format(self.choices)
+
+  def _expression(self, x, constant):
+    return "{} in {}".format(x, constant(self._index))
+
+class UniqueItems(Constraint):
+  """Checks that no two items of a sequence are equal.
+
+  Sequences of unhashable items, such as objects, are compared pairwise.
+  """
+
+  def params(self):
+    return ()
+
+  def _valid(self, xs):
+    try:
+      return len(set(xs)) == len(xs)
+    except TypeError:
+      pass
+    for i, x in enumerate(xs):
+      for y in xs[:i]:
+        if x == y:
+          return False
+    return True
+
+  def _message(self, xs):
+    return "expected unique items"
+
+def length_between(min_, max_):
+  return LengthBetween(min_, max_)
+
+def number_between(min_=None, max_=None):
+  return NumberBetween(min_, max_)
 
 def matches_regex(regex, description=None):
-  requirement = description or "string matching '{}'".format(regex)
-  regex = re.compile("^" + regex + "$")
-  def f(s):
-    if not regex.match(s):
-      raise ValidationFailed("expected {}".format(requirement))
-  return f
+  return MatchesRegex(regex, description)
+
+def has_prefix(prefix):
+  return HasPrefix(prefix)
+
+def has_suffix(suffix):
+  return HasSuffix(suffix)
+
+def one_of(*choices):
+  return OneOf(*choices)
+
+def unique_items():
+  return UniqueItems()
@@ -14,15 +14,25 @@
 
 from __future__ import absolute_import
 
-from rigour.basetypes import JsonType
-from rigour.errors import ValidationFailed
+from rigour.basetypes import (JsonType, Optional, Secret, Constrained,
+                              _ModifierType)
+from rigour.constraints import Constraint
+from rigour.errors import ProgrammingError, ValidationFailed, PathSuffix
 from rigour.util import run_check
+from rigour.valuetypes import (_SimpleType, String, Integer, Float,
+                               StringEnum, Datetime, Date, Any,
+                               _string_types)
 
 from rigour import context
 
+import datetime
+import sys
+import weakref
+
 class FixArray(JsonType):
   def __init__(self, *fields):
     self._fields = fields
+    self._immutable = all(_is_immutable(t) for t in fields)
 
   def _name(self, depth):
     return "[" + ", ".join(field.name(depth) for field in self._fields) + "]"
@@ -31,86 +41,749 @@ class FixArray(JsonType):
     if len(value) != len(self._fields):
       msg = "expected {} elements, got {}".format(len(self._fields), len(value))
       raise ValidationFailed(msg, value=value)
-    for i, (t, el) in enumerate(zip(self._fields, value)):
-      with context.index(i):
+    if self._immutable and _checked_by(value) is self:
+      return
+    try:
+      for i, (t, el) in enumerate(zip(self._fields, value)):
         run_check(t.check, el)
+    except ValidationFailed as e:
+      context.prepend(e, i)
+      raise
+    if type(value) is TrackedList:
+      _set_checked(value, self)
 
   def _to_json(self, value):
     return [t.to_json(el) for (t, el) in zip(self._fields, value)]
 
+  def numeric(self, finite=False, minimum=None, maximum=None):
+    """Returns a `NumericArray` decoding this type into a numpy array."""
+    from rigour.numerictypes import NumericArray
+    return NumericArray(self, finite, minimum, maximum)
+
   def _from_json(self, json_value):
     if len(json_value) != len(self._fields):
       message = "expected {} elements, got {}".format(
         len(self._fields), len(json_value))
       raise ValidationFailed(message)
     rv = []
-    for i, (t, el) in enumerate(zip(self._fields, json_value)):
-      with context.index(i):
+    try:
+      for t, el in zip(self._fields, json_value):
         rv.append(t.from_json(el))
-    return rv
+    except ValidationFailed as e:
+      context.prepend(e, len(rv))
+      raise
+    return TrackedList(rv)
 
 class Array(JsonType):
   def __init__(self, t):
     self._t = t
+    self._immutable = _is_immutable(t)
 
   def _name(self, depth):
     return "[" + self._t.name(depth) + "..]"
 
   def _check(self, value):
-    for i, el in enumerate(value):
-      with context.index(i):
-        run_check(self._t.check, el)
+    # Unchanged lists of immutable values stay valid. Other lists are
+    # walked, but their elements may skip most of their own checks.
+    if self._immutable and _checked_by(value) is self:
+      return
+    check = self._t.check
+    try:
+      for i, el in enumerate(value):
+        run_check(check, el)
+    except ValidationFailed as e:
+      context.prepend(e, i)
+      raise
+    if type(value) is TrackedList:
+      _set_checked(value, self)
 
   def _to_json(self, value):
     return [self._t.to_json(x) for x in value]
 
+  def numeric(self, finite=False, minimum=None, maximum=None):
+    """Returns a `NumericArray` decoding this type into a numpy array."""
+    from rigour.numerictypes import NumericArray
+    return NumericArray(self, finite, minimum, maximum)
+
+  def columnar(self):
+    """Returns a `ColumnarArray` decoding this array of objects by field."""
+    from rigour.columnar import ColumnarArray
+    return ColumnarArray(self._t)
+
   def _from_json(self, value):
+    # The index of a failing element is the number decoded before it.
     rv = []
-    for i, x in enumerate(value):
-      with context.index(i):
-        rv.append(self._t.from_json(x))
+    append = rv.append
+    from_json = self._t.from_json
+    try:
+      for x in value:
+        append(from_json(x))
+    except ValidationFailed as e:
+      context.prepend(e, len(rv))
+      raise
+    return TrackedList(rv)
+
+def _leaf_test(t):
+  """Returns a fast test of values of a simple leaf type, or None.
+
+  The test takes the classes of the type and the `_valid` methods of its
+  declarative constraints. Types that decode values into something else,
+  or have other checkers, have no such test.
+  """
+  valid = []
+  while type(t) is Constrained:
+    if not all(isinstance(c, Constraint) for c in t._checkers):
+      return None
+    valid.extend(c._valid for c in t._checkers)
+    t = t._t
+  if type(t) not in (_SimpleType, Integer, Float) and not (
+      type(t) is String and t._interned is None):
+    return None
+  return t._python_type, valid
+
+class Map(JsonType):
+  """A JSON object with any keys, all of one type, and values of another.
+
+  Keys are decoded by `key_type`, which must take strings. When both key
+  and value types are simple leaves, such as `String` or `Integer` with
+  declarative constraints, a map is checked in one tight loop, and the
+  per-key path of a failure is only worked out once one is found.
+  """
+
+  def __init__(self, key_type, value_type):
+    self._key = key_type
+    self._t = value_type
+    self._key_test = _leaf_test(key_type)
+    self._plain_keys = self._key_test == (_string_types, [])
+    self._leaf = None
+    if self._key_test is not None:
+      self._leaf = _leaf_test(value_type)
+
+  def _name(self, depth):
+    return "{" + self._key.name(depth) + ": " + self._t.name(depth) + "..}"
+
+  def _valid_leaves(self, value):
+    """Returns whether the fast path finds every key and value valid."""
+    classes, valid = self._leaf
+    key_classes, key_valid = self._key_test
+    try:
+      if not self._plain_keys:
+        for k in value:
+          if not isinstance(k, key_classes):
+            return False
+          for f in key_valid:
+            if not f(k):
+              return False
+      for x in value.values():
+        if not isinstance(x, classes):
+          return False
+        for f in valid:
+          if not f(x):
+            return False
+    except Exception:
+      return False
+    return True
+
+  def _check(self, value):
+    if not isinstance(value, dict):
+      raise ValidationFailed("expected Object")
+    if self._leaf is not None and self._valid_leaves(value):
+      return
+    key_check = self._key.check
+    check = self._t.check
+    try:
+      for k, x in value.items():
+        try:
+          run_check(key_check, k)
+        except ValidationFailed as e:
+          e.message = "invalid key: " + e.message
+          raise
+        run_check(check, x)
+    except ValidationFailed as e:
+      context.prepend(e, self._json_key(k))
+      raise
+
+  def _json_key(self, k):
+    """Returns the JSON key of a decoded key, as its place in a path."""
+    try:
+      return self._key.to_json(k)
+    except Exception:
+      # The key is not one of `key_type`.
+      return PathSuffix("[{!r}]".format(k))
+
+  def _from_json(self, value):
+    if not isinstance(value, dict):
+      raise ValidationFailed("expected Object")
+    if self._plain_keys and self._leaf is not None:
+      # Simple leaves decode to themselves.
+      return dict(value)
+    key_from_json = self._key.from_json
+    from_json = self._t.from_json
+    rv = {}
+    try:
+      for k, x in value.items():
+        try:
+          key = key_from_json(k)
+        except ValidationFailed as e:
+          e.message = "invalid key: " + e.message
+          raise
+        rv[key] = from_json(x)
+    except ValidationFailed as e:
+      context.prepend(e, k)
+      raise
     return rv
 
+  def _to_json(self, value):
+    if self._plain_keys and self._leaf is not None:
+      return dict(value)
+    key_to_json = self._key.to_json
+    to_json = self._t.to_json
+    return {key_to_json(k): to_json(x) for (k, x) in value.items()}
+
+class _ObjectAccessor(dict):
+  """Base of the dict-backed values decoded by an `Object`.
+
+  Each `Object` derives its own subclass once, with `_object` set to the
+  schema, rather than defining a class per decoded value.
+
+  `_checked` is set to the `Object` once that has checked the value, and
+  `_dirty` then collects the names of the fields changed since. Changes
+  that are not to a single field clear `_checked` instead. See
+  `Object._check`.
+
+  Changes are not reported to the containers holding a value, so checking
+  an unchanged document again still visits each object and list reached
+  through mutable fields. It skips the leaves, so costs time in proportion
+  to the number of containers, not to the size of the change.
+  """
+
+  __slots__ = ("_checked", "_dirty")
+  _object = None
+
+  def __setitem__(self, name, value):
+    dict.__setitem__(self, name, value)
+    _changed(self, name)
+
+  def __delitem__(self, name):
+    dict.__delitem__(self, name)
+    _changed(self, name)
+
+  def update(self, *args, **kwargs):
+    dict.update(self, *args, **kwargs)
+    _set_checked(self, None)
+
+  def setdefault(self, name, default=None):
+    _changed(self, name)
+    return dict.setdefault(self, name, default)
+
+  def pop(self, name, *args):
+    _changed(self, name)
+    return dict.pop(self, name, *args)
+
+  def popitem(self):
+    _set_checked(self, None)
+    return dict.popitem(self)
+
+  def clear(self):
+    dict.clear(self)
+    _set_checked(self, None)
+
+  def __ior__(self, other):
+    self.update(other)
+    return self
+
+  def __getattr__(self, name):
+    if name in self._object._fields:
+      return self.get(name)
+    else:
+      raise AttributeError("no such attribute: " + name)
+
+  def __setattr__(self, name, value):
+    if name in self._object._fields:
+      self[name] = value
+    else:
+      raise AttributeError("no such attribute: " + name)
+
+  def __delattr__(self, name):
+    if name in self._object._fields:
+      if name in self:
+        del self[name]
+    else:
+      raise AttributeError("no such attribute: " + name)
+
+  def __repr__(self):
+    return "[Object: {}]".format(self._object.name(1))
+
+  def __reduce__(self):
+    return (_restore_accessor, (self._object, dict(self), _clean(self)))
+
+class _FieldMapping(object):
+  """The read-only mapping methods shared by the non-dict `Object` values.
+
+  Subclasses provide `_field` and `_store` to read and write one field.
+  As for `_ObjectAccessor`, `_checked` and `_dirty` record a successful
+  check and the fields changed since.
+  """
+
+  __slots__ = ("_checked", "_dirty")
+  _object = None
+
+  def get(self, name, default=None):
+    if name in self._object._fields:
+      return self._field(name)
+    return default
+
+  def keys(self):
+    return list(self._object._fields)
+
+  def items(self):
+    return [(name, self._field(name)) for name in self._object._fields]
+
+  def __getitem__(self, name):
+    if name in self._object._fields:
+      return self._field(name)
+    raise KeyError(name)
+
+  def __setitem__(self, name, value):
+    if name not in self._object._fields:
+      raise KeyError(name)
+    self._store(name, value)
+
+  def __contains__(self, name):
+    return name in self._object._fields
+
+  def __iter__(self):
+    return iter(self._object._fields)
+
+  def __len__(self):
+    return len(self._object._fields)
+
+  def __eq__(self, other):
+    if isinstance(other, _FieldMapping):
+      other = dict(other.items())
+    return dict(self.items()) == other
+
+  def __ne__(self, other):
+    return not self == other
+
+  __hash__ = None
+
+  def __repr__(self):
+    return "[Object: {}]".format(self._object.name(1))
+
+  def __reduce__(self):
+    return (_restore_accessor, (self._object, dict(self.items()),
+                                _clean(self)))
+
+class _ObjectRecord(_FieldMapping):
+  """Base of the slotted values decoded by a `slotted()` `Object`.
+
+  Holds one slot per declared field instead of a dict, and offers the
+  read-only mapping methods used by `Object` to check and encode it.
+  """
+
+  __slots__ = ()
+
+  def __init__(self, d):
+    for name in self.__slots__:
+      object.__setattr__(self, name, d.get(name))
+
+  def __setattr__(self, name, value):
+    object.__setattr__(self, name, value)
+    _changed(self, name)
+
+  def __delattr__(self, name):
+    setattr(self, name, None)
+
+  def _field(self, name):
+    return getattr(self, name)
+
+  def _store(self, name, value):
+    setattr(self, name, value)
+
+class _LazyObject(_FieldMapping):
+  """Base of the values decoded by a `lazy()` `Object`.
+
+  Keeps the raw JSON dict and decodes each field on first access, caching
+  the result. Errors in a field are raised on that access, with the path
+  of the field within the document that was decoded, and marked secret
+  if the object was decoded within a secret type.
+  """
+
+  __slots__ = ("_raw", "_values", "_path", "_secret")
+
+  def __init__(self, values, raw=None, path=()):
+    object.__setattr__(self, "_values", dict(values))
+    object.__setattr__(self, "_raw", raw if raw is not None else {})
+    object.__setattr__(self, "_path", path)
+    object.__setattr__(self, "_secret", False)
+
+  def _field(self, name):
+    try:
+      return self._values[name]
+    except KeyError:
+      pass
+    raw = self._raw.get(name)
+    path = self._path + (name,)
+    t = self._object._fields[name]
+    try:
+      value = t.from_json(raw)
+      run_check(t.check, value)
+    except ValidationFailed as e:
+      e.context[0:0] = path
+      if self._secret:
+        e.secret = True
+      raise
+    _locate(t, value, path, self._secret)
+    self._values[name] = value
+    return value
+
+  def _store(self, name, value):
+    self._values[name] = value
+    _changed(self, name)
+
+  def _pending(self):
+    return [name for name in self._object._fields if name not in self._values]
+
+  def __getattr__(self, name):
+    if name in self._object._fields:
+      return self._field(name)
+    raise AttributeError("no such attribute: " + name)
+
+  def __setattr__(self, name, value):
+    if name in self._object._fields:
+      self._store(name, value)
+    else:
+      raise AttributeError("no such attribute: " + name)
+
+  def __delattr__(self, name):
+    self.__setattr__(name, None)
+
+class TrackedList(list):
+  """The list decoded by an `Array` or `FixArray`.
+
+  Like the `Object` values, it records the type that last checked it
+  successfully in `_checked`, which any change to it clears, so that an
+  unchanged list of immutable values need not be checked again.
+  """
+
+  __slots__ = ("_checked",)
+
+  def __setitem__(self, i, value):
+    list.__setitem__(self, i, value)
+    _set_checked(self, None)
+
+  def __delitem__(self, i):
+    list.__delitem__(self, i)
+    _set_checked(self, None)
+
+  def __iadd__(self, other):
+    _set_checked(self, None)
+    return list.__iadd__(self, other)
+
+  def __imul__(self, n):
+    _set_checked(self, None)
+    return list.__imul__(self, n)
+
+  def append(self, value):
+    list.append(self, value)
+    _set_checked(self, None)
+
+  def extend(self, values):
+    list.extend(self, values)
+    _set_checked(self, None)
+
+  def insert(self, i, value):
+    list.insert(self, i, value)
+    _set_checked(self, None)
+
+  def pop(self, *args):
+    _set_checked(self, None)
+    return list.pop(self, *args)
+
+  def remove(self, value):
+    list.remove(self, value)
+    _set_checked(self, None)
+
+  def clear(self):
+    del self[:]
+
+  def sort(self, *args, **kwargs):
+    list.sort(self, *args, **kwargs)
+    _set_checked(self, None)
+
+  def reverse(self):
+    list.reverse(self)
+    _set_checked(self, None)
+
+  if sys.version_info.major == 2:
+    def __setslice__(self, i, j, values):
+      list.__setslice__(self, i, j, values)
+      _set_checked(self, None)
+
+    def __delslice__(self, i, j):
+      list.__delslice__(self, i, j)
+      _set_checked(self, None)
+
+  def __reduce__(self):
+    return (_make_checked_list, (list(self), _checked_by(self)))
+
+def _checked_by(value):
+  """Returns the type that last checked a value, if it is unchanged since."""
+  try:
+    return object.__getattribute__(value, "_checked")
+  except AttributeError:
+    return None
+
+def _set_checked(value, t):
+  object.__setattr__(value, "_checked", t)
+
+def _dirty_fields(value):
+  try:
+    return object.__getattribute__(value, "_dirty") or ()
+  except AttributeError:
+    return ()
+
+def _changed(value, name):
+  """Notes a change to one field of an `Object` value."""
+  if _checked_by(value) is None:
+    return
+  dirty = _dirty_fields(value)
+  if dirty:
+    dirty.add(name)
+  else:
+    object.__setattr__(value, "_dirty", set([name]))
+
+# Classes of decoded values that cannot change.
+_LEAF_CLASSES = _string_types + (int, float, bool, datetime.date, type(None))
+if sys.version_info.major == 2:
+  _LEAF_CLASSES += (long,)
+
+def _unchanged(value):
+  """Returns whether a checked value is known to be unchanged since.
+
+  Objects and tracked lists record changes to themselves. Other values
+  that can change, such as the dicts decoded by a `Map`, count as
+  changed.
+  """
+  if isinstance(value, _LEAF_CLASSES):
+    return True
+  if isinstance(value, TrackedList):
+    children = value
+  elif isinstance(value, _LazyObject):
+    if _dirty_fields(value):
+      return False
+    children = value._values.values()
+  elif isinstance(value, _ObjectAccessor):
+    if _dirty_fields(value):
+      return False
+    children = dict.values(value)
+  elif isinstance(value, _FieldMapping):
+    if _dirty_fields(value):
+      return False
+    children = [x for (_, x) in value.items()]
+  else:
+    return False
+  return _checked_by(value) is not None and all(
+    _unchanged(x) for x in children)
+
+def _make_checked_list(values, t):
+  """Makes a list decoded by `t` from values known to be valid."""
+  rv = TrackedList(values)
+  _set_checked(rv, t)
+  return rv
+
+def _clean(value):
+  """Returns whether a value is unchanged since its own type checked it."""
+  return _checked_by(value) is value._object and not _dirty_fields(value)
+
+def _restore_accessor(t, d, checked=False):
+  """Unpickles an `Object` value, still marked checked if it was.
+
+  The type is unpickled along with the value, from a copy of the type
+  that checked it.
+  """
+  if checked:
+    return t._make_checked_accessor(d)
+  return t._make_accessor(d)
+
+_RECORD_METHODS = frozenset(dir(_ObjectRecord))
+_LAZY_METHODS = frozenset(dir(_LazyObject))
+
+_MODIFIER_TYPES = (Optional, Secret, Constrained)
+
+# Types whose decoded values are immutable, so that once checked they
+# stay valid.
+_IMMUTABLE_TYPES = (_SimpleType, String, Integer, Float, StringEnum,
+                    Datetime, Date)
+
+def _is_immutable(t):
+  while isinstance(t, _ModifierType):
+    t = t._t
+  return type(t) in _IMMUTABLE_TYPES
+
+# Whether each type has a lazy `Object` within it.
+_has_lazy = weakref.WeakKeyDictionary()
+
+def _contains_lazy(t):
+  try:
+    return _has_lazy[t]
+  except KeyError:
+    pass
+  u = t
+  while type(u) in _MODIFIER_TYPES:
+    u = u._t
+  if type(u) is Object:
+    rv = u._lazy or any(_contains_lazy(ft) for ft in u._fields.values())
+  elif type(u) is Array:
+    rv = _contains_lazy(u._t)
+  elif type(u) is FixArray:
+    rv = any(_contains_lazy(ft) for ft in u._fields)
+  elif type(u) is Map:
+    rv = _contains_lazy(u._t)
+  elif type(u) is TaggedUnion:
+    rv = any(_contains_lazy(v) for v in u._variants.values())
+  elif type(u) is Union:
+    rv = any(_contains_lazy(v) for v in u._variants)
+  else:
+    rv = False
+  _has_lazy[t] = rv
+  return rv
+
+def _locate(t, value, path=(), secret=False):
+  """Records the path of each lazily decoded object within `value`.
+
+  Also records whether the object is within a secret type, or `secret`.
+  Only the parts of `value` whose type contains a lazy `Object` are
+  visited, so this costs nothing for types without one.
+  """
+  if value is None or not _contains_lazy(t):
+    return
+  secret = secret or t.is_secret()
+  while type(t) in _MODIFIER_TYPES:
+    t = t._t
+  if type(t) is Object:
+    if isinstance(value, _LazyObject):
+      object.__setattr__(value, "_path", tuple(path))
+      object.__setattr__(value, "_secret", secret)
+    else:
+      for name, ft in t._fields.items():
+        _locate(ft, value.get(name), tuple(path) + (name,), secret)
+  elif type(t) is Array:
+    for i, x in enumerate(value):
+      _locate(t._t, x, tuple(path) + (i,), secret)
+  elif type(t) is FixArray:
+    for i, (ft, x) in enumerate(zip(t._fields, value)):
+      _locate(ft, x, tuple(path) + (i,), secret)
+  elif type(t) is Map:
+    for k, x in value.items():
+      _locate(t._t, x, tuple(path) + (t._json_key(k),), secret)
+  elif type(t) is TaggedUnion:
+    _locate(t._variant(value)[1], value, path, secret)
+  elif type(t) is Union:
+    _locate(t._variant(value), value, path, secret)
+
 class Object(JsonType):
   def __init__(self, **fields):
     self._fields = fields
+    self._slotted = False
+    self._lazy = False
+    self._immutable_fields = frozenset(
+      name for (name, t) in fields.items() if _is_immutable(t))
+    self._mutable_fields = [(name, t) for (name, t) in fields.items()
+                            if name not in self._immutable_fields]
+    self._accessor_class = self._make_accessor_class()
   
   def _name(self, depth):
     if depth <= 0:
       return "Object"
     return "{" + ", ".join("{}: {}".format(n, t.name(depth-1)) for (n,t) in self._fields.items()) + "}"
 
-  def _from_json(outer_self, value):
-    class ObjectAccessor(dict):
-      def __getattr__(self, name):
-        if name in outer_self._fields:
-          return self.get(name)
-        else:
-          raise AttributeError("no such attribute: " + name)
-      
-      def __setattr__(self, name, value):
-        if name in outer_self._fields:
-          self[name] = value
-        else:
-          raise AttributeError("no such attribute: " + name)
+  def slotted(self):
+    """Returns a copy of this type decoding into compact slotted records.
 
-      def __delattr__(self, name):
-        if name in outer_self._fields:
-          if name in self:
-            del self[name]
-        else:
-          raise AttributeError("no such attribute: " + name)
+    Records keep one slot per declared field instead of a dict, which
+    saves memory on large arrays of small objects. They support attribute
+    access and the read-only mapping methods, but field names must be
+    valid identifiers that do not shadow those methods.
+    """
+    self._check_field_names(_RECORD_METHODS)
+    rv = Object(**self._fields)
+    rv._slotted = True
+    rv._accessor_class = rv._make_accessor_class()
+    return rv
+
+  def lazy(self):
+    """Returns a copy of this type decoding its fields on first access.
+
+    Decoding only checks for unexpected and missing fields, and keeps the
+    raw JSON dict. Each field is decoded and checked when it is first
+    read, and errors are raised from that read with the field's full
+    path. This makes decoding cheap for large values of which only a few
+    fields are used. The raw dict must not be modified afterwards.
+
+    As with `slotted()`, field names must not shadow the mapping methods.
+    """
+    self._check_field_names(_LAZY_METHODS)
+    rv = Object(**self._fields)
+    rv._lazy = True
+    rv._accessor_class = rv._make_accessor_class()
+    return rv
+
+  def _check_field_names(self, methods):
+    for name in self._fields:
+      if name in methods:
+        message = "field '{}' clashes with a record method".format(name)
+        raise ProgrammingError(message)
 
-      def __repr__(self):
-        return "[Object: {}]".format(outer_self.name(1))
+  def _make_accessor_class(self):
+    if self._lazy:
+      return type("LazyObject", (_LazyObject,),
+                  {"__slots__": (), "_object": self})
+    if self._slotted:
+      return type("ObjectRecord", (_ObjectRecord,),
+                  {"__slots__": tuple(self._fields), "_object": self})
+    return type("ObjectAccessor", (_ObjectAccessor,),
+                {"__slots__": (), "_object": self})
+
+  def _make_accessor(self, d):
+    return self._accessor_class(d)
+
+  def _make_checked_accessor(self, d):
+    """Makes a value from fields that are known to be valid."""
+    rv = self._accessor_class(d)
+    _set_checked(rv, self)
+    object.__setattr__(rv, "_dirty", None)
+    return rv
+
+  def __getstate__(self):
+    state = JsonType.__getstate__(self)
+    del state["_accessor_class"]
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._accessor_class = self._make_accessor_class()
+
+  def _from_json(self, value):
+    if not isinstance(value, dict):
+      raise ValidationFailed("expected Object")
     for name in value:
-      if name not in outer_self._fields:
+      if name not in self._fields:
         raise ValidationFailed("unexpected field '{}'".format(name))
+    if self._lazy:
+      for name, t in self._fields.items():
+        if t.is_required() and value.get(name) is None:
+          raise ValidationFailed("missing field '{}'".format(name))
+      return self._accessor_class((), value)
     d = {}
-    for name, t in outer_self._fields.items():
-      with context.member(name):
+    try:
+      for name, t in self._fields.items():
         d[name] = t.from_json(value.get(name))
-    return ObjectAccessor(**d)
+    except ValidationFailed as e:
+      context.prepend(e, name)
+      raise
+    return self._make_accessor(d)
 
   def _to_json(self, value):
     return {k: self._fields[k].to_json(v)
@@ -120,21 +793,211 @@ class Object(JsonType):
   def _check(self, value):
     if value is None:
       raise ValidationFailed("expected Object")
+    fields = self._fields.items()
+    # For a value this type has checked before, only the fields changed
+    # since need checking, and the mutable ones, for changes within them.
+    # Those are walked even when nothing changed, as changes deep within
+    # them are not recorded here.
+    clean = False
+    if _checked_by(value) is self:
+      dirty = _dirty_fields(value)
+      if dirty:
+        fields = [(name, t) for (name, t) in fields
+                  if name in dirty or name not in self._immutable_fields]
+      else:
+        fields = self._mutable_fields
+        clean = True
+    # Fields of a lazy value that are yet to be read are checked on reading.
+    if isinstance(value, _LazyObject):
+      pending = value._pending()
+      fields = [(name, t) for (name, t) in fields if name not in pending]
     reasons = []
-    for name, t in self._fields.items():
+    for name, t in fields:
       subvalue = value.get(name)
       try:
-        with context.member(name):
-          run_check(t.check, subvalue)
+        run_check(t.check, subvalue)
       except ValidationFailed as e:
+        context.prepend(e, name)
         if subvalue is None:
           reasons.append(ValidationFailed("missing field '{}'".format(name)))
         else:
           reasons.append(e)
-    for name in value.__dict__:
+    accessor = isinstance(value, (_ObjectAccessor, _FieldMapping))
+    for name in () if accessor else getattr(value, "__dict__", ()):
       if name not in self._fields:
         reasons.append(ValidationFailed("unexpected field '{}'".format(name)))
     if reasons:
       if len(reasons) == 1:
         raise reasons[0]
-      raise ValidationFailed(", ".join(r.format() for r in reasons))
+      raise ValidationFailed(", ".join(r.format() for r in reasons),
+                             reasons=reasons)
+    if accessor and not clean and value._object is self:
+      _set_checked(value, self)
+      object.__setattr__(value, "_dirty", None)
+
+def _unwrap_modifiers(t):
+  while isinstance(t, _ModifierType):
+    t = t._t
+  return t
+
+class TaggedUnion(JsonType):
+  """One of several kinds of object, told apart by the value of a field.
+
+  `variants` maps each value of the `tag` field to the type of the
+  objects with that tag, which must be an `Object` declaring the field.
+  Decoding, checking and encoding look the variant up by its tag rather
+  than trying each in turn, and failures name the variant.
+  """
+
+  def __init__(self, tag, variants):
+    for key, t in variants.items():
+      base = _unwrap_modifiers(t)
+      if type(base) is not Object or tag not in base._fields:
+        message = "variant '{}' is not an Object with the field '{}'"
+        raise ProgrammingError(message.format(key, tag))
+    self._tag = tag
+    self._variants = dict(variants)
+
+  def _name(self, depth):
+    return " | ".join(t.name(depth) for t in self._variants.values())
+
+  def _variant(self, value):
+    """Returns the tag of a value and the type of its variant."""
+    if not hasattr(value, "get"):
+      raise ValidationFailed("expected Object")
+    key = value.get(self._tag)
+    try:
+      t = self._variants.get(key)
+    except TypeError:
+      t = None
+    if t is None:
+      if key is None:
+        raise ValidationFailed("missing field '{}'".format(self._tag))
+      message = "unknown {} {!r}, expected one of: {}".format(
+        self._tag, key, ", ".join(
+          str(k) for k in sorted(self._variants, key=repr)))
+      raise ValidationFailed(message)
+    return key, t
+
+  def _suffix(self, key):
+    return PathSuffix("<{}={}>".format(self._tag, key))
+
+  def _from_json(self, value):
+    key, t = self._variant(value)
+    try:
+      return t.from_json(value)
+    except ValidationFailed as e:
+      context.prepend(e, self._suffix(key))
+      raise
+
+  def _check(self, value):
+    key, t = self._variant(value)
+    try:
+      run_check(t.check, value)
+    except ValidationFailed as e:
+      context.prepend(e, self._suffix(key))
+      raise
+
+  def _to_json(self, value):
+    return self._variant(value)[1].to_json(value)
+
+def _union_classes(t):
+  """Returns the classes of JSON and decoded values taken by `t`.
+
+  The second set of classes is only taken if no other type takes them.
+  """
+  base = _unwrap_modifiers(t)
+  if type(base) is Object:
+    return (dict, _FieldMapping), ()
+  if type(base) is TaggedUnion:
+    return (dict, _FieldMapping), ()
+  if type(base) is Map:
+    return (dict,), ()
+  if type(base) in (Array, FixArray):
+    return (list, tuple), ()
+  if type(base) is StringEnum:
+    return _string_types + ((int,) if base._codes else ()), ()
+  if type(base) is Datetime:
+    return _string_types + (datetime.datetime,), ()
+  if type(base) is Date:
+    return _string_types + (datetime.date,), ()
+  if type(base) is Float:
+    return (float,), Integer()._python_type
+  if isinstance(base, _SimpleType):
+    classes = base._python_type
+    return classes if isinstance(classes, tuple) else (classes,), ()
+  message = "{} cannot be told apart from other types in a Union"
+  raise ProgrammingError(message.format(t.name(0)))
+
+class Union(JsonType):
+  """One of several types that take different kinds of JSON value.
+
+  The class of a value picks its type: at most one of the types may take
+  objects, one arrays, one strings, and so on. A floating-point type also
+  takes integers if no integer type is given, and `Any` takes whatever
+  the others do not. Objects of several kinds are told apart with a
+  `TaggedUnion` instead.
+  """
+
+  def __init__(self, *variants):
+    self._variants = variants
+    self._by_class = {}
+    self._any = None
+    fallbacks = {}
+    for t in variants:
+      if type(_unwrap_modifiers(t)) is Any:
+        if self._any is not None:
+          raise ProgrammingError("Union has more than one Any")
+        self._any = t
+        continue
+      classes, extra = _union_classes(t)
+      for cls in classes:
+        other = self._by_class.get(cls)
+        if other is not None:
+          message = "{} and {} both take {} in a Union"
+          raise ProgrammingError(message.format(
+            other.name(0), t.name(0), cls.__name__))
+        self._by_class[cls] = t
+      for cls in extra:
+        fallbacks.setdefault(cls, t)
+    for cls, t in fallbacks.items():
+      self._by_class.setdefault(cls, t)
+
+  def _name(self, depth):
+    return " | ".join(t.name(depth) for t in self._variants)
+
+  def _variant(self, value):
+    cls = value.__class__
+    t = self._by_class.get(cls)
+    if t is None:
+      for base in cls.__mro__[1:]:
+        t = self._by_class.get(base)
+        if t is not None:
+          break
+      else:
+        t = self._any
+      if t is None:
+        raise ValidationFailed("expected {}".format(self._name(1)))
+    return t
+
+  def _suffix(self, t):
+    return PathSuffix("<{}>".format(t.name(0)))
+
+  def _from_json(self, value):
+    t = self._variant(value)
+    try:
+      return t.from_json(value)
+    except ValidationFailed as e:
+      context.prepend(e, self._suffix(t))
+      raise
+
+  def _check(self, value):
+    t = self._variant(value)
+    try:
+      run_check(t.check, value)
+    except ValidationFailed as e:
+      context.prepend(e, self._suffix(t))
+      raise
+
+  def _to_json(self, value):
+    return self._variant(value).to_json(value)
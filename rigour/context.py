@@ -12,27 +12,46 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""Context managers adding to the path of a `ValidationFailed`.
+
+These are convenient outside of hot loops. Code that runs per element
+catches `ValidationFailed` and calls `prepend` instead, which costs
+nothing unless validation fails.
+"""
+
 from __future__ import absolute_import
 
-from rigour.errors import ValidationFailed
+from rigour.errors import ValidationFailed, PathSuffix
 
 import contextlib
+import numbers
+
+def prepend(e, key):
+  """Adds an outer member name or index to the path of `e`."""
+  e.context.insert(0, key)
 
 @contextlib.contextmanager
 def contained_as(suffix):
   try:
     yield
   except ValidationFailed as e:
-    e.context.insert(0, suffix)
+    prepend(e, PathSuffix(suffix))
     raise
 
 @contextlib.contextmanager
 def member(name):
-  with contained_as("." + name):
+  try:
     yield
+  except ValidationFailed as e:
+    prepend(e, name)
+    raise
 
 @contextlib.contextmanager
 def index(key):
-  with contained_as("[" + str(key) + "]"):
+  try:
     yield
-
+  except ValidationFailed as e:
+    if not isinstance(key, numbers.Integral):
+      key = PathSuffix("[" + str(key) + "]")
+    prepend(e, key)
+    raise
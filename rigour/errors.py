@@ -14,15 +14,65 @@
 
 from __future__ import absolute_import
 
+import numbers
+
+class PathSuffix(str):
+  """A context entry that is shown as-is rather than as a key or index."""
+
+def format_path(path):
+  """Formats a path of member names and indices, like `a.b[3].c`."""
+  rv = []
+  for key in path:
+    if isinstance(key, PathSuffix):
+      rv.append(key)
+    elif isinstance(key, numbers.Integral):
+      rv.append("[{}]".format(key))
+    else:
+      rv.append("." + key)
+  rv = "".join(rv)
+  if rv.startswith("."):
+    rv = rv[1:]
+  return rv
+
 class ProgrammingError(Exception):
   pass
 
 class ValidationFailed(Exception):
-  def __init__(self, message, value=None, context=(), secret=False):
+  """A value failed to validate.
+
+  `context` is the path to the value within the document, as a list of
+  member names and array indices, outermost first. Containers only add
+  to it as the exception propagates, so tracking the path costs nothing
+  while validation succeeds.
+  """
+
+  def __init__(self, message, value=None, context=(), secret=False,
+               reasons=()):
     self.message = message
     self.value = value
     self.context = list(context)
     self.secret = secret
+    self.reasons = list(reasons)
+
+  def flatten(self):
+    """Returns the individual failures this one was combined from.
+
+    Each returned failure carries the full context and secrecy of its
+    position. A failure that was not combined flattens to itself.
+    """
+    if not self.reasons:
+      return [self]
+    rv = []
+    for reason in self.reasons:
+      for leaf in reason.flatten():
+        rv.append(ValidationFailed(leaf.message, value=leaf.value,
+                                   context=self.context + leaf.context,
+                                   secret=self.secret or leaf.secret))
+    return rv
+
+  @property
+  def path(self):
+    return tuple(self.context)
 
   def show_value(self, show_secrets):
     if self.secret and not show_secrets:
@@ -32,10 +82,7 @@ class ValidationFailed(Exception):
 
   def show_context(self):
     if self.context:
-      rv = "".join(map(str, self.context))
-      if rv.startswith("."):
-        rv = rv[1:]
-      return rv
+      return format_path(self.context)
 
   def format(self, show_secrets=False):
     ctx = self.show_context() or ""
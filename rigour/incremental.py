@@ -0,0 +1,207 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.basetypes import Optional, Secret
+from rigour.compiler import compile
+from rigour.containertypes import Array, Object
+from rigour.errors import ProgrammingError, ValidationFailed
+
+from rigour import context
+
+import codecs
+import json
+import re
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+# What may be left of a JSON value cut off at the end of the window: an
+# unterminated string, the rest of a number, or the start of a literal.
+_partial_string = re.compile(r'"(?:[^"\\]|\\.)*\\?\Z', re.DOTALL)
+_partial_number = re.compile(r"-?[0-9]*\.?[0-9]*(?:[eE][-+]?[0-9]*)?\Z")
+_literals = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+def _truncated(text, pos):
+  """Returns whether a JSON error at `pos` may be due to `text` ending.
+
+  Errors elsewhere are in the input itself, and more of it will not help.
+  """
+  if pos is None:
+    return True
+  rest = text[pos:].lstrip(" \t\n\r")
+  return (not rest or _partial_string.match(rest) is not None or
+          _partial_number.match(rest) is not None or
+          any(literal.startswith(rest) for literal in _literals))
+
+def _array_element_type(t):
+  while type(t) in (Optional, Secret):
+    t = t._t
+  if type(t) is not Array:
+    raise ProgrammingError("expected an Array type, got {}".format(t.name(1)))
+  return t._t
+
+class _Buffer(object):
+  """A window onto a stream of JSON text, read in chunks."""
+
+  def __init__(self, fileobj, chunk_size):
+    self._fileobj = fileobj
+    self._chunk_size = chunk_size
+    self._decoder = codecs.getincrementaldecoder("utf-8")()
+    self._json = json.JSONDecoder()
+    self._text = u""
+    self._pos = 0
+    self._eof = False
+
+  def _fill(self, size):
+    """Appends at least one more chunk, returning False at end of input."""
+    while not self._eof:
+      data = self._fileobj.read(size)
+      if not data:
+        self._eof = True
+        data = self._decoder.decode(b"", True)
+      elif isinstance(data, bytes):
+        data = self._decoder.decode(data)
+      if data:
+        self._text = self._text[self._pos:] + data
+        self._pos = 0
+        return True
+    return False
+
+  def peek(self):
+    """Returns the next non-whitespace character, or "" at end of input."""
+    while True:
+      self._pos = _whitespace.match(self._text, self._pos).end()
+      if self._pos < len(self._text):
+        return self._text[self._pos]
+      if not self._fill(self._chunk_size):
+        return ""
+
+  def expect(self, chars):
+    c = self.peek()
+    if not c or c not in chars:
+      found = repr(c) if c else "end of input"
+      message = "invalid JSON: expected {}, found {}".format(
+        " or ".join(repr(x) for x in chars), found)
+      raise ValidationFailed(message)
+    self._pos += 1
+    return c
+
+  def value(self):
+    """Parses the next complete JSON value."""
+    while True:
+      self.peek()
+      try:
+        rv, end = self._json.raw_decode(self._text, self._pos)
+      except ValueError as e:
+        if _truncated(self._text, getattr(e, "pos", None)) and self._fill(
+            max(self._chunk_size, len(self._text) - self._pos)):
+          continue
+        raise ValidationFailed("invalid JSON: {}".format(e))
+      # A number at the very end of the window may continue in the next
+      # chunk, so a value is only complete if followed by something else.
+      if end == len(self._text) and self._fill(self._chunk_size):
+        continue
+      self._pos = end
+      return rv
+
+class ArrayStream(object):
+  """Decodes the elements of a large JSON array as they are read.
+
+  The array is either the whole document, for an `Array` type, or the
+  member named `field` of the top-level object, for an `Object` type.
+  Iterating yields each element decoded and validated as soon as it has
+  been read, so memory use is bounded by the largest element rather than
+  the document. Errors carry the element's path, as with `from_json`.
+
+  With `field`, the other members of the object are validated once the
+  whole document has been read, and their decoded values are then
+  available as `remainder`.
+  """
+
+  def __init__(self, t, fileobj, field=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    self._fileobj = fileobj
+    self._field = field
+    self._chunk_size = chunk_size
+    self.remainder = None
+    if field is None:
+      self._t = t
+    else:
+      if type(t) is not Object or field not in t._fields:
+        message = "expected an Object type with field '{}'".format(field)
+        raise ProgrammingError(message)
+      self._t = t._fields[field]
+      self._rest_t = Object(**{name: ft for (name, ft) in t._fields.items()
+                               if name != field})
+    self._element_t = _array_element_type(self._t)
+    # Elements are decoded by their own type, so the secrecy of the array
+    # is applied to their failures here.
+    self._secret = self._t.is_secret()
+
+  def __iter__(self):
+    buf = _Buffer(self._fileobj, self._chunk_size)
+    if self._field is None:
+      for value in self._elements(buf):
+        yield value
+    else:
+      seen = False
+      rest = {}
+      buf.expect("{")
+      if buf.peek() == "}":
+        buf.expect("}")
+      else:
+        while True:
+          key = buf.value()
+          buf.expect(":")
+          if key == self._field and not seen:
+            seen = True
+            with context.member(self._field):
+              for value in self._elements(buf):
+                yield value
+          else:
+            rest[key] = buf.value()
+          if buf.expect(",}") == "}":
+            break
+      if not seen and self._t.is_required():
+        raise ValidationFailed("missing field '{}'".format(self._field))
+      self.remainder = compile(self._rest_t).from_json(rest)
+    if buf.peek():
+      raise ValidationFailed("invalid JSON: trailing data after document")
+
+  def _elements(self, buf):
+    if buf.peek() != "[":
+      values = compile(self._t).from_json(buf.value())
+      for value in values or ():
+        yield value
+      return
+    buf.expect("[")
+    if buf.peek() == "]":
+      buf.expect("]")
+      return
+    from_json = compile(self._element_t).from_json
+    i = 0
+    while True:
+      try:
+        value = from_json(buf.value())
+      except ValidationFailed as e:
+        context.prepend(e, i)
+        if self._secret:
+          e.secret = True
+        raise
+      yield value
+      i += 1
+      if buf.expect(",]") == "]":
+        break
@@ -0,0 +1,253 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounds on the size of JSON input, enforced before decoding starts.
+
+A `Limits` scans the raw JSON value once, without looking at the schema,
+and rejects it as soon as it finds a container or string over a limit.
+This bounds the work done on hostile input, which would otherwise be
+decoded and checked in full before a `length_between` rejects it.
+
+Limits apply to a single call, as `rigour.from_json(t, value, limits)`,
+or to a type, as `t.limited(limits)`. `Limits.derived(t)` works out the
+largest input a schema can possibly accept from its structure and its
+`length_between` constraints.
+"""
+
+from __future__ import absolute_import
+
+from rigour import context
+from rigour.basetypes import Constrained, _ModifierType
+from rigour.constraints import LengthBetween
+from rigour.containertypes import (Array, FixArray, Map, Object, TaggedUnion,
+                                   Union)
+from rigour.errors import ValidationFailed
+from rigour.valuetypes import (String, StringEnum, Integer, Float, Datetime,
+                               Date)
+
+import sys
+
+if sys.version_info.major == 2:
+  _TEXT_TYPES = (unicode, str)
+  _ENCODE_ERRORS = "strict"
+else:
+  _TEXT_TYPES = (str,)
+  _ENCODE_ERRORS = "surrogatepass"
+
+# The most bytes a character takes in UTF-8.
+_MAX_CHARACTER_BYTES = 4
+
+def _too_long(s, limit):
+  """Returns whether `s` takes more than `limit` bytes in UTF-8."""
+  n = len(s)
+  if n > limit:
+    return True
+  if n * _MAX_CHARACTER_BYTES <= limit or isinstance(s, bytes):
+    return False
+  return len(s.encode("utf-8", _ENCODE_ERRORS)) > limit
+
+class Limits(object):
+  """Limits on the size of a JSON value. None means no limit.
+
+  max_depth: containers nested within one another.
+  max_items: elements of an array.
+  max_string_bytes: UTF-8 bytes of a string, including object keys.
+  max_fields: members of an object.
+  max_nodes: values in the whole document, counting containers.
+  """
+
+  def __init__(self, max_depth=None, max_items=None, max_string_bytes=None,
+               max_fields=None, max_nodes=None):
+    self.max_depth = max_depth
+    self.max_items = max_items
+    self.max_string_bytes = max_string_bytes
+    self.max_fields = max_fields
+    self.max_nodes = max_nodes
+
+  @classmethod
+  def derived(cls, t, **defaults):
+    """Returns the limits of the largest value `t` can accept.
+
+    Limits that `t` does not bound, such as the length of an array
+    without a `length_between` constraint, are taken from `defaults`,
+    which are keyword arguments as for the constructor.
+    """
+    bounds = _bounds(t)
+    options = dict(zip(_LIMITS, bounds))
+    for name, value in defaults.items():
+      if name not in _LIMITS:
+        raise TypeError("unknown limit '{}'".format(name))
+      if options[name] is None:
+        options[name] = value
+    return cls(**options)
+
+  def enforce(self, value):
+    """Raises `ValidationFailed` if a JSON value exceeds the limits."""
+    budget = [None if self.max_nodes is None else self.max_nodes - 1]
+    if budget[0] is not None and budget[0] < 0:
+      self._fail("too many values", self.max_nodes)
+    cls = value.__class__
+    if cls is dict or cls is list:
+      self._scan(value, 1, budget)
+    elif isinstance(value, _TEXT_TYPES):
+      self._check_string(value)
+
+  def within(self, value):
+    """Returns whether a JSON value is within the limits."""
+    try:
+      self.enforce(value)
+    except ValidationFailed:
+      return False
+    return True
+
+  def _fail(self, message, limit):
+    raise ValidationFailed("{} (limit is {})".format(message, limit))
+
+  def _check_string(self, s):
+    if self.max_string_bytes is not None and _too_long(
+        s, self.max_string_bytes):
+      self._fail("string too long", self.max_string_bytes)
+
+  def _scan(self, value, depth, budget):
+    if self.max_depth is not None and depth > self.max_depth:
+      self._fail("nested too deeply", self.max_depth)
+    if value.__class__ is dict:
+      if self.max_fields is not None and len(value) > self.max_fields:
+        self._fail("too many fields", self.max_fields)
+      items = value.items()
+    else:
+      if self.max_items is not None and len(value) > self.max_items:
+        self._fail("too many elements", self.max_items)
+      items = enumerate(value)
+    if budget[0] is not None:
+      budget[0] -= len(value)
+      if budget[0] < 0:
+        self._fail("too many values", self.max_nodes)
+    check_keys = value.__class__ is dict and self.max_string_bytes is not None
+    key = None
+    try:
+      for key, x in items:
+        if check_keys:
+          self._check_string(key)
+        cls = x.__class__
+        if cls is dict or cls is list:
+          self._scan(x, depth + 1, budget)
+        elif isinstance(x, _TEXT_TYPES):
+          self._check_string(x)
+    except ValidationFailed as e:
+      if key is not None:
+        context.prepend(e, key)
+      raise
+
+_LIMITS = ("max_depth", "max_items", "max_string_bytes", "max_fields",
+           "max_nodes")
+
+def _max(*values):
+  if None in values:
+    return None
+  return max(values)
+
+def _utf8_length(s):
+  return len(s.encode("utf-8", _ENCODE_ERRORS))
+
+def _length_bound(checkers):
+  """Returns the tightest maximum length among `checkers`, or None."""
+  rv = None
+  for checker in checkers:
+    if isinstance(checker, LengthBetween) and checker.max is not None:
+      rv = checker.max if rv is None else min(rv, checker.max)
+  return rv
+
+# Bounds of leaf types, with no containers, as ordered in `_LIMITS`.
+_SCALAR = (0, 0, 0, 0, 1)
+_STRING = (0, 0, None, 0, 1)
+_UNBOUNDED = (None, None, None, None, None)
+
+def _bounds(t, checkers=()):
+  """Returns the largest input `t` accepts, ordered as `_LIMITS`.
+
+  Each bound is None where it is unbounded. Zero means that the input
+  has no containers or strings of that kind at all.
+  """
+  if isinstance(t, _ModifierType):
+    if isinstance(t, Constrained):
+      checkers = tuple(checkers) + tuple(t._checkers)
+    return _bounds(t._t, checkers)
+  if type(t) in (Integer, Float):
+    return _SCALAR
+  if type(t) is String:
+    length = _length_bound(checkers)
+    if length is None:
+      return _STRING
+    return (0, 0, length * _MAX_CHARACTER_BYTES, 0, 1)
+  if type(t) in (Date, Datetime):
+    return _STRING
+  if type(t) is StringEnum:
+    if t._ignore_case:
+      # Other cases of a choice may take more bytes than the choice.
+      longest = max([len(c.lower()) * _MAX_CHARACTER_BYTES
+                     for c in t._choices] + [0])
+    else:
+      longest = max([_utf8_length(c) for c in t._choices] + [0])
+    return (0, 0, longest, 0, 1)
+  if type(t) is Array:
+    depth, items, string_bytes, fields, nodes = _bounds(t._t)
+    length = _length_bound(checkers)
+    return (None if depth is None else depth + 1,
+            _max(length, items),
+            string_bytes, fields,
+            None if None in (length, nodes) else 1 + length * nodes)
+  if type(t) is FixArray:
+    children = [_bounds(u) for u in t._fields] or [_SCALAR]
+    depth, items, string_bytes, fields, nodes = zip(*children)
+    return (None if None in depth else max(depth) + 1,
+            _max(len(t._fields), *items),
+            _max(*string_bytes), _max(*fields),
+            None if None in nodes else 1 + sum(nodes))
+  if type(t) is Object:
+    names = [_utf8_length(name) for name in t._fields]
+    children = [_bounds(u) for u in t._fields.values()] or [_SCALAR]
+    depth, items, string_bytes, fields, nodes = zip(*children)
+    return (None if None in depth else max(depth) + 1,
+            _max(*items),
+            _max(max(names + [0]), *string_bytes),
+            _max(len(t._fields), *fields),
+            None if None in nodes else 1 + sum(nodes))
+  if type(t) is Map:
+    key = _bounds(t._key)
+    depth, items, string_bytes, fields, nodes = _bounds(t._t)
+    length = _length_bound(checkers)
+    return (None if depth is None else depth + 1,
+            items,
+            _max(key[2], string_bytes),
+            _max(length, fields),
+            None if None in (length, nodes) else 1 + length * nodes)
+  if type(t) in (TaggedUnion, Union):
+    variants = t._variants
+    if isinstance(variants, dict):
+      variants = variants.values()
+    children = [_bounds(u) for u in variants] or [_SCALAR]
+    return tuple(_max(*bounds) for bounds in zip(*children))
+  return _UNBOUNDED
+
+class Limited(_ModifierType):
+  """Enforces `Limits` on the JSON value before decoding it."""
+
+  def __init__(self, t, limits):
+    _ModifierType.__init__(self, t)
+    self._limits = limits
+
+  def _from_json(self, json_value):
+    self._limits.enforce(json_value)
+    return self._t.from_json(json_value)
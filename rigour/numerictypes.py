@@ -0,0 +1,139 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.basetypes import JsonType
+from rigour.containertypes import Array, FixArray
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.util import run_check
+from rigour.valuetypes import Float, Integer
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+def _element_dtype(t):
+  if type(t) is Float:
+    return "float64", "fiub"
+  if type(t) is Integer:
+    return "int64", "ib"
+  raise ProgrammingError("expected Float or Integer, got " + t.name(1))
+
+def _layout(t):
+  """Returns the dtype, accepted kinds and shape of a numeric array type.
+
+  A dimension of None in the shape is variable.
+  """
+  if type(t) is FixArray:
+    if not t._fields:
+      raise ProgrammingError("expected a non-empty FixArray")
+    dtypes = set(_element_dtype(field) for field in t._fields)
+    if len(dtypes) != 1:
+      raise ProgrammingError("expected FixArray elements of a single type")
+    dtype, kinds = dtypes.pop()
+    return dtype, kinds, (len(t._fields),)
+  if type(t) is Array:
+    if type(t._t) is FixArray:
+      dtype, kinds, shape = _layout(t._t)
+      return dtype, kinds, (None,) + shape
+    dtype, kinds = _element_dtype(t._t)
+    return dtype, kinds, (None,)
+  raise ProgrammingError("expected Array or FixArray, got " + t.name(1))
+
+class NumericArray(JsonType):
+  """An `Array` or `FixArray` of numbers decoded into a numpy array.
+
+  Supports `Array(Float())`, `Array(Integer())`, `FixArray`s of either
+  and an `Array` of such a `FixArray`, which decodes into a 2-D array.
+  Floats decode to float64 and integers to int64.
+
+  Type checks are done on the whole array at once. `finite` rejects NaN
+  and infinities, and `minimum` and `maximum` bound the elements. The
+  first offending element is reported, with its index.
+  """
+
+  def __init__(self, t, finite=False, minimum=None, maximum=None):
+    if numpy is None:
+      raise ProgrammingError("NumericArray requires numpy")
+    self._t = t
+    self._dtype, self._kinds, self._shape = _layout(t)
+    self._finite = finite
+    self._minimum = minimum
+    self._maximum = maximum
+
+  def _name(self, depth):
+    return self._t.name(depth)
+
+  def _has_shape(self, arr):
+    if arr.ndim != len(self._shape):
+      return False
+    return all(n is None or n == m for (n, m) in zip(self._shape, arr.shape))
+
+  def _from_json(self, value):
+    arr = None
+    if isinstance(value, list):
+      try:
+        arr = numpy.array(value)
+      except ValueError:
+        pass
+    if arr is None or arr.dtype.kind not in self._kinds or not (
+        self._has_shape(arr)):
+      # Let the element types report the first offending element. Values
+      # they accept may still not fit, such as integers beyond 64 bits.
+      decoded = self._t.from_json(value)
+      run_check(self._t.check, decoded)
+      try:
+        arr = numpy.array(decoded, dtype=self._dtype)
+      except OverflowError:
+        raise ValidationFailed("number out of range for " + self._dtype)
+      if not len(decoded):
+        arr = arr.reshape((0,) + self._shape[1:])
+    arr = arr.astype(self._dtype, copy=False)
+    self._check_bounds(arr)
+    return arr
+
+  def _check_bounds(self, arr):
+    if self._finite and arr.dtype.kind == "f":
+      bad = ~numpy.isfinite(arr)
+      if bad.any():
+        self._fail(arr, bad, "expected finite number")
+    if self._minimum is not None:
+      bad = arr < self._minimum
+      if bad.any():
+        self._fail(arr, bad, "below minimum {}".format(self._minimum))
+    if self._maximum is not None:
+      bad = arr > self._maximum
+      if bad.any():
+        self._fail(arr, bad, "exceeds maximum {}".format(self._maximum))
+
+  def _fail(self, arr, bad, message):
+    index = numpy.unravel_index(numpy.flatnonzero(bad)[0], arr.shape)
+    index = tuple(int(i) for i in index)
+    raise ValidationFailed(message, value=arr[index].item(),
+                           context=index)
+
+  def _check(self, value):
+    if not isinstance(value, numpy.ndarray):
+      raise ValidationFailed("expected numpy array", value=value)
+    if value.dtype != numpy.dtype(self._dtype) or not self._has_shape(value):
+      message = "expected {} array of shape {}, got {} array of shape {}"
+      shape = tuple(n if n is not None else "n" for n in self._shape)
+      raise ValidationFailed(message.format(self._dtype, shape, value.dtype,
+                                            value.shape))
+    self._check_bounds(value)
+
+  def _to_json(self, value):
+    return value.tolist()
@@ -0,0 +1,241 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Validation of large batches and files across a pool of processes.
+
+Validation is CPU-bound, so these functions shard the work into chunks
+and hand them to a `multiprocessing` pool. Results and errors come back
+in input order. Each function takes either a number of `processes` for a
+pool that lives for the duration of the call, or an existing `pool` to
+reuse across calls.
+
+Types are sent to the workers by pickling, so checkers must be picklable:
+module-level functions and the classes in `rigour.constraints` are, but
+lambdas and closures are not. Decoded values come back bound to the
+caller's type rather than to a copy of it, and still marked as checked,
+so that encoding them does not check them again.
+"""
+
+from __future__ import absolute_import
+
+from rigour.basetypes import _subtypes
+from rigour.batch import BatchResult, iter_from_json_many
+from rigour.compiler import compile
+from rigour.errors import ValidationFailed
+from rigour import stream
+
+import contextlib
+import io
+import mmap
+import multiprocessing
+import os
+import pickle
+
+DEFAULT_BATCH_CHUNK_SIZE = 1000
+DEFAULT_FILE_CHUNK_BYTES = 1 << 24
+
+# Worker-side cache of unpickled types, so that each worker compiles a
+# given type once rather than once per task.
+_types = {}
+
+def _load_type(pickled):
+  """Returns an unpickled type, and the number of each type within it."""
+  rv = _types.get(pickled)
+  if rv is None:
+    t = pickle.loads(pickled)
+    rv = _types[pickled] = (t, {id(u): i for (i, u) in enumerate(_walk(t))})
+  return rv
+
+def _walk(t):
+  """Returns the types within `t`, in an order that pickling keeps."""
+  rv = [t]
+  seen = set([id(t)])
+  i = 0
+  while i < len(rv):
+    for u in _subtypes(rv[i]):
+      if id(u) not in seen:
+        seen.add(id(u))
+        rv.append(u)
+    i += 1
+  return rv
+
+class _Pickler(pickle.Pickler):
+  """Pickles the results of a worker, referring to its types by number."""
+
+  def __init__(self, f, ids):
+    pickle.Pickler.__init__(self, f, pickle.HIGHEST_PROTOCOL)
+    self._ids = ids
+
+  def persistent_id(self, obj):
+    return self._ids.get(id(obj))
+
+class _Unpickler(pickle.Unpickler):
+  """Unpickles the results of a worker with the caller's types."""
+
+  def __init__(self, f, types):
+    pickle.Unpickler.__init__(self, f)
+    self._types = types
+
+  def persistent_load(self, i):
+    return self._types[i]
+
+def _dump_results(ids, results):
+  f = io.BytesIO()
+  _Pickler(f, ids).dump(results)
+  return f.getvalue()
+
+def _load_results(types, data):
+  return _Unpickler(io.BytesIO(data), types).load()
+
+@contextlib.contextmanager
+def _pool(pool, processes):
+  if pool is not None:
+    yield pool
+    return
+  pool = multiprocessing.Pool(processes)
+  try:
+    yield pool
+  finally:
+    pool.terminate()
+    pool.join()
+
+def _from_json_chunk(task):
+  pickled, start, values = task
+  t, ids = _load_type(pickled)
+  return _dump_results(ids, [(start + i, value, error)
+                             for (i, value, error)
+                             in iter_from_json_many(t, values)])
+
+def _chunks(values, size):
+  chunk = []
+  start = 0
+  for value in values:
+    chunk.append(value)
+    if len(chunk) >= size:
+      yield start, chunk
+      start += len(chunk)
+      chunk = []
+  if chunk:
+    yield start, chunk
+
+def from_json_many(t, values, processes=None, pool=None,
+                   chunk_size=DEFAULT_BATCH_CHUNK_SIZE):
+  """Like `rigour.from_json_many`, but spread across a process pool."""
+  pickled = pickle.dumps(t, pickle.HIGHEST_PROTOCOL)
+  tasks = ((pickled, start, chunk)
+           for (start, chunk) in _chunks(values, chunk_size))
+  types = _walk(t)
+  rv = BatchResult([], [])
+  with _pool(pool, processes) as p:
+    for data in p.imap(_from_json_chunk, tasks):
+      for i, value, error in _load_results(types, data):
+        rv.values.append(value)
+        if error is not None:
+          rv.errors.append((i, error))
+  return rv
+
+def _line_start(m, pos, size):
+  """Returns the start of the first line beginning at or after `pos`."""
+  if pos <= 0:
+    return 0
+  if pos >= size:
+    return size
+  newline = m.find(b"\n", pos - 1)
+  return size if newline < 0 else newline + 1
+
+def _ndjson_range(task):
+  pickled, path, start, end, collect, chunk_size = task
+  t, ids = _load_type(pickled)
+  compiled = compile(t)
+  values = [] if collect else None
+  valid = 0
+  errors = []
+  newlines = 0
+  with open(path, "rb") as f:
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+      return _dump_results(ids, (newlines, valid, values, errors))
+    m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      start = _line_start(m, start, size)
+      end = _line_start(m, end, size)
+      for pos in range(start, end, chunk_size):
+        newlines += m[pos:min(pos + chunk_size, end)].count(b"\n")
+      lines = stream._iter_lines(m, start, end, chunk_size)
+      for i, line in enumerate(lines):
+        if not line.strip():
+          continue
+        try:
+          if collect:
+            values.append(stream._decode_line(compiled.from_json, line))
+          else:
+            value = stream._parse_line(line)
+            if not compiled.is_valid(value):
+              compiled.from_json(value)
+          valid += 1
+        except ValidationFailed as e:
+          errors.append((i, e))
+    finally:
+      m.close()
+  return _dump_results(ids, (newlines, valid, values, errors))
+
+def _iter_ndjson_ranges(t, path, processes, pool, collect, chunk_bytes,
+                        chunk_size):
+  pickled = pickle.dumps(t, pickle.HIGHEST_PROTOCOL)
+  size = os.path.getsize(path)
+  tasks = ((pickled, path, start, start + chunk_bytes, collect, chunk_size)
+           for start in range(0, size, chunk_bytes))
+  types = _walk(t)
+  first_line = 1
+  with _pool(pool, processes) as p:
+    for data in p.imap(_ndjson_range, tasks):
+      newlines, valid, values, errors = _load_results(types, data)
+      yield first_line, valid, values, errors
+      first_line += newlines
+
+def iter_ndjson(t, path, errors=None, processes=None, pool=None,
+                chunk_bytes=DEFAULT_FILE_CHUNK_BYTES,
+                chunk_size=stream.DEFAULT_CHUNK_SIZE):
+  """Like `rigour.stream.iter_ndjson`, but spread across a process pool.
+
+  The file is split into byte ranges of about `chunk_bytes`, aligned to
+  line boundaries, and each range is decoded by a worker. Values are
+  yielded and errors appended in file order.
+  """
+  ranges = _iter_ndjson_ranges(t, path, processes, pool, True, chunk_bytes,
+                               chunk_size)
+  for first_line, _, values, range_errors in ranges:
+    if errors is not None:
+      errors.extend((first_line + i, e) for (i, e) in range_errors)
+    for value in values:
+      yield value
+
+def validate_ndjson(t, path, processes=None, pool=None,
+                    chunk_bytes=DEFAULT_FILE_CHUNK_BYTES,
+                    chunk_size=stream.DEFAULT_CHUNK_SIZE):
+  """Validates a newline-delimited JSON file across a process pool.
+
+  Returns the number of valid values and a list of (line_number,
+  ValidationFailed) pairs. Decoded values are never sent back from the
+  workers, which makes this much cheaper than `iter_ndjson` when only
+  the outcome is needed.
+  """
+  valid = 0
+  errors = []
+  ranges = _iter_ndjson_ranges(t, path, processes, pool, False, chunk_bytes,
+                               chunk_size)
+  for first_line, range_valid, _, range_errors in ranges:
+    valid += range_valid
+    errors.extend((first_line + i, e) for (i, e) in range_errors)
+  return valid, errors
@@ -0,0 +1,194 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Time spent in each part of a schema.
+
+  with Profiler(t) as profiler:
+    rigour.from_json(t, value)
+  print(profiler.report())
+
+Within the block, `from_json`, `check` and `to_json` of every type in `t`,
+and every checker of its constrained types, count their calls and time.
+The hooks are installed on entering the block and removed on leaving it,
+so outside of a profiler the types run exactly as before.
+
+Times are kept per path in the document, like `name.given_name` or
+`titles[]`, along with the type and operation. Self time excludes the
+time spent in the nested types and checkers that were also timed. A type
+object used at several places in the schema is reported under `*` where
+its paths differ. Compiled decoders do not go through the hooks, and
+are not cached while a profiler is active, so that none built within
+the block keep its hooks. Only one thread should run profiled types at
+a time.
+"""
+
+from __future__ import absolute_import
+
+from rigour import basetypes
+from rigour.basetypes import Constrained, _ModifierType, _subtypes, _uncache
+from rigour.containertypes import Array, FixArray, Object
+from rigour.errors import PathSuffix, format_path
+
+import time
+
+_timer = getattr(time, "perf_counter", time.time)
+
+_OPERATIONS = ("from_json", "check", "to_json")
+
+_ANY_INDEX = PathSuffix("[]")
+_ANY_MEMBER = PathSuffix(".*")
+
+def _positions(t):
+  """Returns the path segment leading to each type below `t`, by id.
+
+  Modifiers add no segment to the path of the type they modify, marked
+  by None. The root's segment is also None.
+  """
+  segments = {id(t): None}
+  types = [t]
+  i = 0
+  while i < len(types):
+    u = types[i]
+    i += 1
+    if isinstance(u, Object):
+      children = list(u._fields.items())
+    elif isinstance(u, FixArray):
+      children = list(enumerate(u._fields))
+    elif isinstance(u, (Array, _ModifierType)):
+      segment = _ANY_INDEX if isinstance(u, Array) else None
+      children = [(segment, v) for v in _subtypes(u)]
+    else:
+      children = [(None, v) for v in _subtypes(u)]
+    for segment, v in children:
+      if id(v) not in segments:
+        segments[id(v)] = segment
+        types.append(v)
+      elif segments[id(v)] != segment:
+        segments[id(v)] = _ANY_MEMBER
+  return [(u, segments[id(u)]) for u in types]
+
+def _checker_name(checker):
+  return getattr(checker, "__name__", None) or type(checker).__name__
+
+class Profiler(object):
+  """Counts calls and time spent in the parts of a schema.
+
+  Profiling the same schema again in another block adds to the counts.
+  """
+
+  def __init__(self, t):
+    self._t = t
+    self._stats = {}
+    self._stack = []
+    self._restore = []
+
+  def __enter__(self):
+    basetypes._profiling += 1
+    for u, segment in _positions(self._t):
+      # Compiled decoders and encoders built before would bypass the
+      # hooks, and ones built within the block would keep them.
+      _uncache(u)
+      for operation in _OPERATIONS:
+        self._patch(u, operation,
+                    self._timed(getattr(u, operation), segment,
+                                type(u).__name__, operation))
+      if isinstance(u, Constrained):
+        checkers = tuple(self._timed(checker, None, _checker_name(checker),
+                                     "checker")
+                         for checker in u._checkers)
+        self._patch(u, "_checkers", checkers)
+    return self
+
+  def __exit__(self, *exc_info):
+    while self._restore:
+      u, name, previous = self._restore.pop()
+      if previous is _MISSING:
+        delattr(u, name)
+      else:
+        setattr(u, name, previous)
+      _uncache(u)
+    del self._stack[:]
+    basetypes._profiling -= 1
+
+  def _patch(self, u, name, value):
+    self._restore.append((u, name, u.__dict__.get(name, _MISSING)))
+    setattr(u, name, value)
+
+  def _timed(self, f, segment, type_name, operation):
+    stats = self._stats
+    stack = self._stack
+    def timed(value):
+      path = stack[-1][0] if stack else ()
+      if segment is not None:
+        path = path + (segment,)
+      frame = [path, 0.0]
+      stack.append(frame)
+      start = _timer()
+      try:
+        return f(value)
+      finally:
+        elapsed = _timer() - start
+        stack.pop()
+        if stack:
+          stack[-1][1] += elapsed
+        key = (path, type_name, operation)
+        entry = stats.get(key)
+        if entry is None:
+          entry = stats[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] += elapsed - frame[1]
+    return timed
+
+  def stats(self):
+    """Returns a record of each timed part, most self time first.
+
+    Each is a dict of the path, type (or checker) name and operation,
+    with the number of calls and the cumulative and self time in seconds.
+    """
+    rv = [{
+      "path": format_path(path),
+      "type": type_name,
+      "operation": operation,
+      "calls": calls,
+      "cumulative": cumulative,
+      "self": self_time,
+    } for ((path, type_name, operation),
+           (calls, cumulative, self_time)) in self._stats.items()]
+    rv.sort(key=lambda entry: entry["self"], reverse=True)
+    return rv
+
+  def as_dict(self):
+    """Returns the stats keyed by "path:type.operation", for exporting."""
+    return {"{}:{}.{}".format(entry["path"], entry["type"],
+                              entry["operation"]): {
+              "calls": entry["calls"],
+              "cumulative": entry["cumulative"],
+              "self": entry["self"],
+            } for entry in self.stats()}
+
+  def report(self, limit=None):
+    """Returns the stats as a table of text, most self time first."""
+    lines = ["{:>10} {:>12} {:>12}  {}".format(
+      "calls", "cumulative", "self", "path: type.operation")]
+    for entry in self.stats()[:limit]:
+      lines.append("{:>10} {:>12.6f} {:>12.6f}  {}: {}.{}".format(
+        entry["calls"], entry["cumulative"], entry["self"],
+        entry["path"] or "<root>", entry["type"], entry["operation"]))
+    return "\n".join(lines)
+
+  def clear(self):
+    self._stats.clear()
+
+_MISSING = object()
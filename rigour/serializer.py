@@ -0,0 +1,196 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Encoding of values straight to JSON text.
+
+`dumps(t, value)` gives the same text as `json.dumps(to_json(t, value))`,
+but walks the schema and writes pieces of text instead of building the
+intermediate tree of dicts and lists. `iter_dumps` yields the text in
+chunks, and `dump` writes them to a file, so that large arrays are never
+held in full as text either.
+"""
+
+from __future__ import absolute_import
+
+from rigour.basetypes import _ModifierType, _cached
+from rigour.containertypes import Array, FixArray, Object
+from rigour.util import run_check
+from rigour.valuetypes import String, Integer, Float, StringEnum
+
+import io
+import json
+import json.encoder
+import math
+import sys
+
+DEFAULT_CHUNK_SIZE = 1 << 12
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+if sys.version_info.major == 2:
+  _INTEGER_TYPES = (int, long)
+else:
+  _INTEGER_TYPES = (int,)
+
+def _unwrap(t):
+  while isinstance(t, _ModifierType):
+    t = t._t
+  return t
+
+def _encode_number(x, write):
+  if x is True:
+    write("true")
+  elif x is False:
+    write("false")
+  elif type(x) in _INTEGER_TYPES:
+    write(str(x))
+  elif type(x) is float and not (math.isnan(x) or math.isinf(x)):
+    write(float.__repr__(x))
+  else:
+    write(json.dumps(x))
+
+def _make_encoder(t):
+  base = _unwrap(t)
+  if type(base) is String:
+    def encode(value, write):
+      write(_encode_string(value))
+  elif type(base) in (Integer, Float):
+    encode = _encode_number
+  elif type(base) is StringEnum:
+    to_json = base._to_json
+    def encode(value, write):
+      write(_encode_string(to_json(value)))
+  elif type(base) is Array:
+    encode_element = _encoder(base._t)
+    def encode(value, write):
+      write("[")
+      first = True
+      for x in value:
+        if not first:
+          write(", ")
+        first = False
+        encode_element(x, write)
+      write("]")
+  elif type(base) is FixArray:
+    encode_elements = [_encoder(ft) for ft in base._fields]
+    def encode(value, write):
+      write("[")
+      for i, (encode_element, x) in enumerate(zip(encode_elements, value)):
+        if i:
+          write(", ")
+        encode_element(x, write)
+      write("]")
+  elif type(base) is Object:
+    fields = _object_fields(base)
+    def encode(value, write):
+      separator = "{"
+      for name, x in value.items():
+        if x is None:
+          continue
+        prefix, encode_field = fields[name]
+        write(separator)
+        write(prefix)
+        encode_field(x, write)
+        separator = ", "
+      write("}" if separator == ", " else "{}")
+  else:
+    to_json = t.to_json
+    dumps = json.dumps
+    def encode(value, write):
+      write(dumps(to_json(value)))
+    return encode
+  def encode_or_null(value, write):
+    if value is None:
+      write("null")
+    else:
+      encode(value, write)
+  return encode_or_null
+
+def _object_fields(t):
+  """Returns the encoded key and value encoder of each field of `t`."""
+  return {name: (_encode_string(name) + ": ", _encoder(ft))
+          for (name, ft) in t._fields.items()}
+
+def _encoder(t):
+  # Kept on the type, as encoders refer back to it.
+  return _cached(t, "_json_encoder", _make_encoder)
+
+def _stream(t, value, parts, chunk_size):
+  """Yields as `parts` fills, at the elements of the outer containers.
+
+  Objects and Arrays are walked in the generator, down to the elements
+  of Arrays, which are encoded whole.
+  """
+  write = parts.append
+  base = _unwrap(t)
+  if value is None:
+    write("null")
+  elif type(base) is Array:
+    encode_element = _encoder(base._t)
+    write("[")
+    for i, x in enumerate(value):
+      if i:
+        write(", ")
+      encode_element(x, write)
+      if len(parts) >= chunk_size:
+        yield
+    write("]")
+  elif type(base) is Object:
+    fields = _object_fields(base)
+    separator = "{"
+    for name, x in value.items():
+      if x is None:
+        continue
+      prefix, _ = fields[name]
+      write(separator)
+      write(prefix)
+      for _ in _stream(base._fields[name], x, parts, chunk_size):
+        yield
+      separator = ", "
+    write("}" if separator == ", " else "{}")
+  else:
+    _encoder(t)(value, write)
+
+def iter_dumps(t, value, chunk_size=DEFAULT_CHUNK_SIZE):
+  """Yields the JSON text of a value in chunks.
+
+  The value is checked first, as by `rigour.to_json`. A chunk is yielded
+  whenever about `chunk_size` pieces of text have been written, which
+  happens between the elements of arrays.
+  """
+  run_check(t.check, value)
+  parts = []
+  for _ in _stream(t, value, parts, chunk_size):
+    yield "".join(parts)
+    del parts[:]
+  if parts:
+    yield "".join(parts)
+
+def dumps(t, value):
+  """Returns the JSON text of a value, as `json.dumps(to_json(t, value))`."""
+  run_check(t.check, value)
+  parts = []
+  _encoder(t)(value, parts.append)
+  return "".join(parts)
+
+def dump(t, value, fileobj, chunk_size=DEFAULT_CHUNK_SIZE):
+  """Writes the JSON text of a value to a file, chunk by chunk.
+
+  Binary files are given the text encoded as bytes. It is always ASCII,
+  since non-ASCII characters are escaped as by `json.dumps`.
+  """
+  binary = isinstance(fileobj, (io.RawIOBase, io.BufferedIOBase)) or (
+    "b" in getattr(fileobj, "mode", ""))
+  for chunk in iter_dumps(t, value, chunk_size):
+    fileobj.write(chunk.encode("ascii") if binary else chunk)
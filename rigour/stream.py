@@ -0,0 +1,138 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Validation of newline-delimited JSON files in constant memory.
+
+Can also be run as a script to validate a file against a schema:
+
+  python -m rigour.stream some.module:Schema data.ndjson
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+from rigour.compiler import compile
+from rigour.errors import ValidationFailed
+
+import argparse
+import importlib
+import json
+import mmap
+import os
+import sys
+import time
+
+DEFAULT_CHUNK_SIZE = 1 << 22
+
+def _iter_lines(m, start, end, chunk_size):
+  """Yields the lines of m[start:end], reading it in chunks."""
+  pending = []
+  pos = start
+  while pos < end:
+    chunk = m[pos:min(pos + chunk_size, end)]
+    pos += len(chunk)
+    lines = chunk.split(b"\n")
+    if len(lines) == 1:
+      pending.append(chunk)
+      continue
+    if pending:
+      pending.append(lines[0])
+      lines[0] = b"".join(pending)
+      pending = []
+    pending.append(lines.pop())
+    for line in lines:
+      yield line
+  if pending:
+    line = b"".join(pending)
+    if line:
+      yield line
+
+def _parse_line(line):
+  try:
+    return json.loads(line.decode("utf-8"))
+  except ValueError as e:
+    raise ValidationFailed("invalid JSON: {}".format(e))
+
+def _decode_line(from_json, line):
+  return from_json(_parse_line(line))
+
+def _iter_range(t, m, start, end, errors, first_line, chunk_size):
+  from_json = compile(t).from_json
+  for i, line in enumerate(_iter_lines(m, start, end, chunk_size)):
+    if not line.strip():
+      continue
+    try:
+      yield _decode_line(from_json, line)
+    except ValidationFailed as e:
+      if errors is not None:
+        errors.append((first_line + i, e))
+
+def iter_ndjson(t, path, errors=None, chunk_size=DEFAULT_CHUNK_SIZE):
+  """Yields the decoded values of a newline-delimited JSON file.
+
+  The file is memory-mapped and read in chunks of `chunk_size` bytes, so
+  memory use does not grow with the size of the file. Blank lines are
+  skipped. Lines that fail to parse or validate are not yielded; if
+  `errors` is a list, a (line_number, ValidationFailed) pair is appended
+  to it for each of them, with line numbers counting from 1.
+  """
+  with open(path, "rb") as f:
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+      return
+    m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      for value in _iter_range(t, m, 0, size, errors, 1, chunk_size):
+        yield value
+    finally:
+      m.close()
+
+def _load_type(spec):
+  module_name, _, attribute = spec.partition(":")
+  if not attribute:
+    raise ValueError("expected module:attribute, got '{}'".format(spec))
+  return getattr(importlib.import_module(module_name), attribute)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(
+    prog="python -m rigour.stream",
+    description="Validate a newline-delimited JSON file against a schema.")
+  parser.add_argument("schema", help="the schema, as module:attribute")
+  parser.add_argument("path", help="the file to validate")
+  parser.add_argument("--show-secrets", action="store_true",
+                      help="include secret values in error messages")
+  parser.add_argument("--processes", type=int, default=1,
+                      help="validate in parallel with this many processes")
+  args = parser.parse_args(argv)
+
+  t = _load_type(args.schema)
+  started = time.time()
+  if args.processes > 1:
+    from rigour import parallel
+    valid, errors = parallel.validate_ndjson(t, args.path, args.processes)
+  else:
+    errors = []
+    valid = sum(1 for _ in iter_ndjson(t, args.path, errors))
+  elapsed = max(time.time() - started, 1e-9)
+  for line_number, e in errors:
+    print("line {}: {}".format(line_number, e.format(args.show_secrets)),
+          file=sys.stderr)
+  size = os.path.getsize(args.path)
+  print("valid: {}, invalid: {}".format(valid, len(errors)))
+  print("{:.3f}s, {:.0f} values/s, {:.1f} MB/s".format(
+    elapsed, (valid + len(errors)) / elapsed, size / elapsed / 1e6))
+  return 1 if errors else 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,203 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks of decoding, checking and encoding.
+
+Run as a script to print the timings as JSON, optionally saving them as
+a baseline or comparing them against one:
+
+  python -m rigour.tests.benchmark --save baseline.json
+  python -m rigour.tests.benchmark --baseline baseline.json --tolerance 0.2
+
+The comparison fails, with exit status 1, if any benchmark is slower than
+its baseline by more than the tolerance. Timings are only comparable on
+the same machine and Python version. `test_benchmark.py` runs the same
+comparison under pytest.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+from rigour.errors import ValidationFailed
+from rigour.tests.schema import Request
+from rigour.types import *
+import rigour
+
+import argparse
+import collections
+import json
+import platform
+import sys
+import timeit
+
+DEFAULT_TOLERANCE = 0.25
+
+REQUEST = {
+  "username": "svk",
+  "password": "hunter22",
+  "name": {"given_name": "Steinar", "family_name": "Kaldager"},
+  "titles": ["Dr", "Prof"],
+  "position": [59.9, 10.7],
+  "birthdate": "1985-01-02",
+  "gender": "other",
+  "timestamp": "2015-08-20T01:58:42.205677+00:00",
+  "payment_info": {"card_number": "4111-1111-1111-1111"},
+  "extra": {"tags": [1, 2, 3]},
+}
+
+def _deep(depth):
+  t = Integer()
+  value = 0
+  for i in range(depth):
+    t = Object(n=Integer(), child=t)
+    value = {"n": i, "child": value}
+  return t, value
+
+def _wide(width):
+  names = ["field_{}".format(i) for i in range(width)]
+  t = Object(**{name: String() for name in names})
+  return t, {name: name for name in names}
+
+def _cases():
+  """Returns the benchmarked types and values, by name."""
+  codes = ["C{:03d}".format(i) for i in range(500)]
+  invalid = [dict(REQUEST) for _ in range(99)] + [dict(REQUEST, username="x")]
+  return collections.OrderedDict([
+    ("request", (Request, REQUEST)),
+    ("deep", _deep(50)),
+    ("wide", _wide(200)),
+    ("floats", (Array(Float()), [i * 0.5 for i in range(100000)])),
+    ("enums", (Array(StringEnum(*codes)), codes * 100)),
+    ("datetimes", (Array(Datetime()),
+                   ["2015-08-20T01:{:02d}:{:02d}.{:06d}Z".format(
+                     i // 60 % 60, i % 60, i) for i in range(20000)])),
+    ("invalid", (Array(Request), invalid)),
+  ])
+
+def _operations(t, value):
+  """Returns the operations to time on a type and a JSON value.
+
+  Each is (name, f, make). Where `make` is not None, `f` is called on a
+  new value from `make`, built before timing starts.
+  """
+  compiled = rigour.compile(t)
+  try:
+    decoded = rigour.from_json(t, value)
+  except ValidationFailed:
+    def decode_invalid():
+      try:
+        rigour.from_json(t, value)
+      except ValidationFailed:
+        pass
+    return [
+      ("from_json", decode_invalid, None),
+      ("is_valid", lambda: compiled.is_valid(value), None),
+      ("validate_errors", lambda: rigour.validate_errors(t, value), None),
+    ]
+  return [
+    ("from_json", lambda: rigour.from_json(t, value), None),
+    ("compiled", lambda: compiled.from_json(value), None),
+    # Values remember being checked, so each check and encoding gets one
+    # decoded without checking.
+    ("check", t.check, lambda: t.from_json(value)),
+    ("to_json", lambda v: rigour.to_json(t, v), lambda: t.from_json(value)),
+    # Encoding a value checked before, which skips most of the check.
+    ("to_json_checked", lambda: rigour.to_json(t, decoded), None),
+  ]
+
+def _time(f, make, number):
+  """Returns the seconds taken by `number` calls of an operation."""
+  if make is None:
+    return timeit.timeit(f, number=number)
+  values = [make() for _ in range(number)]
+  start = timeit.default_timer()
+  for value in values:
+    f(value)
+  return timeit.default_timer() - start
+
+def run(names=None, repeat=3, min_time=0.2):
+  """Runs the benchmarks, returning seconds per call by name.
+
+  Each operation is called often enough to take at least `min_time`
+  seconds, and the best of `repeat` such runs is reported.
+  """
+  results = collections.OrderedDict()
+  for case, (t, value) in _cases().items():
+    if names and case not in names:
+      continue
+    for operation, f, make in _operations(t, value):
+      number = 1
+      while True:
+        elapsed = _time(f, make, number)
+        if elapsed >= min_time:
+          break
+        number *= 2 if elapsed <= 0 else max(2, int(min_time / elapsed) + 1)
+      times = [elapsed] + [_time(f, make, number)
+                           for _ in range(repeat - 1)]
+      results["{}.{}".format(case, operation)] = min(times) / number
+  return results
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+  """Returns (name, baseline, result) for each regression beyond tolerance.
+
+  Benchmarks missing from either side are ignored.
+  """
+  regressions = []
+  for name, expected in baseline.items():
+    actual = results.get(name)
+    if actual is not None and actual > expected * (1 + tolerance):
+      regressions.append((name, expected, actual))
+  return regressions
+
+def report(results):
+  return {
+    "python": platform.python_version(),
+    "implementation": platform.python_implementation(),
+    "results": results,
+  }
+
+def load_baseline(path):
+  with open(path) as f:
+    return json.load(f)["results"]
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(
+    prog="python -m rigour.tests.benchmark",
+    description="Benchmark decoding, checking and encoding.")
+  parser.add_argument("names", nargs="*", help="the cases to run")
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--min-time", type=float, default=0.2)
+  parser.add_argument("--save", help="write the results to this file")
+  parser.add_argument("--baseline", help="compare against this file")
+  parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                      help="the allowed slowdown, as a fraction")
+  args = parser.parse_args(argv)
+
+  results = run(args.names, args.repeat, args.min_time)
+  print(json.dumps(report(results), indent=2))
+  if args.save:
+    with open(args.save, "w") as f:
+      json.dump(report(results), f, indent=2)
+  if args.baseline:
+    regressions = compare(results, load_baseline(args.baseline),
+                          args.tolerance)
+    for name, expected, actual in regressions:
+      print("{}: {:.3g}s, baseline {:.3g}s ({:+.0%})".format(
+        name, actual, expected, actual / expected - 1), file=sys.stderr)
+    if regressions:
+      return 1
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,134 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import pytest
+
+asyncio = pytest.importorskip("asyncio")
+aio = pytest.importorskip("rigour.aio")
+
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.types import *
+import rigour
+
+def run(coroutine):
+  loop = asyncio.new_event_loop()
+  try:
+    return loop.run_until_complete(coroutine)
+  finally:
+    loop.close()
+
+class Registry(object):
+  """Answers lookups after a delay, recording how many overlap."""
+
+  def __init__(self, taken):
+    self.taken = set(taken)
+    self.active = 0
+    self.most_active = 0
+
+  async def available(self, name):
+    self.active += 1
+    self.most_active = max(self.most_active, self.active)
+    await asyncio.sleep(0.01)
+    self.active -= 1
+    if name in self.taken:
+      raise ValidationFailed("already taken")
+
+def users(registry):
+  return Array(Object(
+    name = String().constrain(registry.available),
+    age = Integer(),
+  ))
+
+def test_async_checkers_overlap():
+  registry = Registry(["root"])
+  t = users(registry)
+  value = [{"name": "user{}".format(i), "age": i} for i in range(20)]
+  decoded = run(rigour.from_json_async(t, value))
+  assert [u.name for u in decoded] == [u["name"] for u in value]
+  assert registry.most_active == 20
+  assert rigour.to_json(t, decoded) == value
+
+def test_async_failures():
+  t = users(Registry(["root", "admin"]))
+  value = [{"name": "root", "age": 1}, {"name": "ok", "age": 2},
+           {"name": "admin", "age": 3}]
+  with pytest.raises(ValidationFailed) as e:
+    run(rigour.from_json_async(t, value))
+  assert [r.path for r in e.value.flatten()] == [(0, "name"), (2, "name")]
+  with pytest.raises(ValidationFailed) as e:
+    run(rigour.from_json_async(t, [{"name": "ok", "age": "old"}]))
+  assert e.value.path == (0, "age")
+
+def test_synchronous_paths_reject_async_checkers():
+  t = String().constrain(Registry([]).available)
+  with pytest.raises(ProgrammingError) as e:
+    rigour.from_json(t, "x")
+  assert "rigour.aio" in str(e.value)
+  with pytest.raises(ProgrammingError):
+    rigour.compile(t).from_json("x")
+  assert run(rigour.check_async(t, "x")) is None
+
+def test_yields_to_the_loop():
+  ticks = []
+  async def ticker():
+    while True:
+      ticks.append(None)
+      await asyncio.sleep(0)
+  async def decode():
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    before = len(ticks)
+    rv = await aio.from_json(Array(Array(Float())),
+                             [[1.0] * 100] * 100, yield_every=100)
+    task.cancel()
+    return rv, len(ticks) - before
+  rv, ticks_during = run(decode())
+  assert len(rv) == 100
+  assert ticks_during >= 100
+
+def test_maps():
+  registry = Registry(["root"])
+  t = Map(String().constrain(registry.available),
+          Object(age=Integer().constrain(registry.available)))
+  value = {"user{}".format(i): {"age": i} for i in range(10)}
+  decoded = run(aio.from_json(t, value, yield_every=4))
+  assert decoded["user3"].age == 3
+  assert registry.most_active == 20
+  with pytest.raises(ValidationFailed) as e:
+    run(aio.from_json(t, dict(value, root={"age": 1})))
+  assert e.value.path == ("root",)
+  with pytest.raises(ValidationFailed) as e:
+    run(aio.from_json(t, dict(value, user3={"age": "old"})))
+  assert e.value.path == ("user3", "age")
+
+def test_unions():
+  registry = Registry(["root"])
+  name = String().constrain(registry.available)
+  t = Array(TaggedUnion("kind", {
+    "user": Object(kind=String(), name=name),
+    "group": Object(kind=String(), members=Array(Union(name, Integer()))),
+  }))
+  value = [{"kind": "user", "name": "a"},
+           {"kind": "group", "members": ["b", 1, "c"]}]
+  decoded = run(aio.from_json(t, value))
+  assert decoded[1].members == ["b", 1, "c"]
+  assert registry.most_active == 3
+  with pytest.raises(ValidationFailed) as e:
+    run(aio.from_json(t, value + [{"kind": "group", "members": [2, "root"]}]))
+  assert e.value.path == (2, "<kind=group>", "members", 1, "<string>")
+  with pytest.raises(ValidationFailed) as e:
+    run(aio.from_json(t, [{"kind": "user", "name": 3}]))
+  assert e.value.path == (0, "<kind=user>", "name")
@@ -0,0 +1,63 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.tests.schema import Request
+import rigour
+
+def test_from_json_many():
+  reqs = [
+    {"username": "svk", "password": "hunter2"},
+    {"username": "x", "password": "hunter2"},
+    {"username": "buffy", "password": "slayer", "gender": "female"},
+    {"username": "svk", "password": "hunt"},
+  ]
+  result = rigour.from_json_many(Request, reqs)
+  assert len(result.values) == 4
+  assert result.values[0].username == "svk"
+  assert result.values[1] is None
+  assert result.values[2].gender == "female"
+  assert [i for (i, e) in result.errors] == [1, 3]
+  assert "username: too short" in str(result.errors[0][1])
+  assert "hunt" not in str(result.errors[1][1])
+
+def test_from_json_many_non_objects():
+  valid = {"username": "svk", "password": "hunter2"}
+  result = rigour.from_json_many(Request, [None, 42, "svk", [], valid])
+  assert result.values[:4] == [None] * 4
+  assert result.values[4].username == "svk"
+  assert [i for (i, e) in result.errors] == [0, 1, 2, 3]
+  assert "expected Object" in str(result.errors[1][1])
+
+def test_iter_from_json_many_is_lazy():
+  def values():
+    yield {"username": "svk", "password": "hunter2"}
+    raise AssertionError("consumed too far")
+  results = rigour.iter_from_json_many(Request, values())
+  i, value, error = next(results)
+  assert i == 0
+  assert value.username == "svk"
+  assert error is None
+
+def test_to_json_many():
+  good = rigour.from_json(Request, {"username": "svk", "password": "hunter2"})
+  bad = rigour.from_json(Request, {"username": "svk", "password": "hunter2"})
+  bad.username = "x"
+  result = rigour.to_json_many(Request, [good, bad])
+  assert result.values == [{"username": "svk", "password": "hunter2"}, None]
+  assert len(result.errors) == 1
+  assert result.errors[0][0] == 1
+  assert isinstance(result.errors[0][1], ValidationFailed)
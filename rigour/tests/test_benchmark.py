@@ -0,0 +1,62 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs the benchmarks when RIGOUR_BENCHMARK is set.
+
+With RIGOUR_BENCHMARK_BASELINE set to a file saved by the benchmark
+script, fails on regressions beyond RIGOUR_BENCHMARK_TOLERANCE.
+"""
+
+from __future__ import absolute_import
+
+from rigour.containertypes import _checked_by
+from rigour.tests import benchmark
+
+import os
+import pytest
+
+def test_compare():
+  baseline = {"a.from_json": 1.0, "b.from_json": 1.0, "c.from_json": 1.0}
+  results = {"a.from_json": 1.2, "b.from_json": 1.3}
+  assert benchmark.compare(results, baseline, 0.25) == [
+    ("b.from_json", 1.0, 1.3)]
+
+def test_operations_run():
+  for t, value in benchmark._cases().values():
+    for _, f, make in benchmark._operations(t, value):
+      if make is None:
+        f()
+      else:
+        f(make())
+
+def test_check_is_timed_on_unchecked_values():
+  t, value = benchmark._cases()["request"]
+  _, check, make = [op for op in benchmark._operations(t, value)
+                    if op[0] == "check"][0]
+  decoded = make()
+  assert _checked_by(decoded) is None
+  check(decoded)
+  assert _checked_by(decoded) is not None
+
+@pytest.mark.skipif(not os.environ.get("RIGOUR_BENCHMARK"),
+                    reason="RIGOUR_BENCHMARK is not set")
+def test_benchmark():
+  results = benchmark.run()
+  path = os.environ.get("RIGOUR_BENCHMARK_BASELINE")
+  if path:
+    tolerance = float(os.environ.get("RIGOUR_BENCHMARK_TOLERANCE",
+                                     benchmark.DEFAULT_TOLERANCE))
+    regressions = benchmark.compare(results, benchmark.load_baseline(path),
+                                    tolerance)
+    assert not regressions
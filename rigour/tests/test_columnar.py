@@ -0,0 +1,82 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.types import *
+from rigour.constraints import length_between
+import rigour
+
+import array
+import pickle
+import pytest
+
+Event = Object(
+  id = Integer(),
+  kind = StringEnum("click", "view"),
+  page = String().constrain(length_between(1, 32)),
+  duration = Float().optional(),
+  day = Date().optional(),
+)
+
+Events = Array(Event).columnar()
+
+ROWS = [
+  {"id": 1, "kind": "click", "page": "/home", "duration": 1.5},
+  {"id": 2, "kind": "view", "page": "/home", "day": "2015-08-20"},
+  {"id": 3, "kind": "click", "page": "/about", "duration": 2},
+]
+
+def test_columnar_decode():
+  cols = rigour.from_json(Events, ROWS)
+  assert len(cols) == 3
+  assert isinstance(cols.id, array.array)
+  assert list(cols.id) == [1, 2, 3]
+  assert list(cols["duration"]) == [1.5, 0.0, 2.0]
+  assert list(cols.nulls["duration"]) == [0, 1, 0]
+  assert cols.page == ["/home", "/home", "/about"]
+  assert cols.page[0] is cols.page[1]
+  assert cols.day[1].year == 2015
+  assert cols.row(1).duration is None
+  assert cols.row(2).page == "/about"
+
+def test_columnar_roundtrip():
+  cols = rigour.from_json(Events, ROWS)
+  assert rigour.to_json(Events, cols) == rigour.to_json(
+    Array(Event), rigour.from_json(Array(Event), ROWS))
+
+def test_columnar_error_matches_array():
+  rows = ROWS + [{"id": 4, "kind": "click", "page": ""}]
+  with pytest.raises(ValidationFailed) as expected:
+    rigour.from_json(Array(Event), rows)
+  with pytest.raises(ValidationFailed) as actual:
+    rigour.from_json(Events, rows)
+  assert str(actual.value) == str(expected.value)
+  assert str(actual.value).startswith("[3].page: too short")
+
+def test_columnar_large_integers():
+  cols = rigour.from_json(Events, [dict(ROWS[0], id=2 ** 70), ROWS[1]])
+  assert list(cols.id) == [2 ** 70, 2]
+  assert rigour.to_json(Events, cols)[0]["id"] == 2 ** 70
+
+def test_columnar_pickle():
+  t = Array(Object(at=Datetime(), event=Event)).columnar()
+  cols = rigour.from_json(t, [{"at": "2015-08-20T01:58:42Z",
+                               "event": ROWS[0]}])
+  t2, cols2 = pickle.loads(pickle.dumps((t, cols)))
+  t2.check(cols2)
+  assert rigour.to_json(t2, rigour.from_json(t2, rigour.to_json(t, cols))) \
+    == rigour.to_json(t, cols)
+  t.check(pickle.loads(pickle.dumps(cols)))
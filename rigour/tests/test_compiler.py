@@ -0,0 +1,147 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.tests.schema import Request
+from rigour.types import *
+from rigour.constraints import length_between
+import rigour
+
+import gc
+import pickle
+import pytest
+import weakref
+
+compiled_request = rigour.compile(Request)
+
+def error_message(t, compiled, value):
+  with pytest.raises(ValidationFailed) as expected:
+    rigour.from_json(t, value)
+  with pytest.raises(ValidationFailed) as actual:
+    compiled.from_json(value)
+  assert str(actual.value) == str(expected.value)
+  return str(actual.value)
+
+def test_compiled_valid():
+  req = {
+    "username": "harald",
+    "password": "hunter2",
+    "birthdate": "1937-02-21",
+    "timestamp": "2015-08-20T01:58:42.205677+00:00",
+    "titles": ["Programmer"],
+    "payment_info": {
+      "card_number": "4111-1111-1111-1111",
+    },
+    "name": {
+      "given_name": "Harald",
+      "family_name": "Rex",
+    },
+    "position": [123, 456],
+    "gender": "male",
+  }
+  val = compiled_request.from_json(req)
+  assert val == rigour.from_json(Request, req)
+  assert val.name.given_name == "Harald"
+  assert val.payment_info.card_number == "4111111111111111"
+  assert rigour.to_json(Request, val) == req
+
+def test_compiled_errors_match():
+  base = {"username": "svk", "password": "hunter2"}
+  cases = [
+    {"username": "x"},
+    {"password": "hunt"},
+    {"name": {"given_name": "Harald"}},
+    {"name": {"given_name": "harald", "family_name": ""}},
+    {"gender": "femal3"},
+    {"titles": ["Programmer", 42]},
+    {"position": [123, 456, 789]},
+    {"payment_info": {"card_number": "1234-5678-9012-3456"}},
+    {"this_field_does_not_exist": 42},
+  ]
+  for case in cases:
+    req = dict(base, **case)
+    assert error_message(Request, compiled_request, req)
+
+def test_compiled_secret_elided():
+  req = {"username": "svk", "password": "hunt"}
+  message = error_message(Request, compiled_request, req)
+  assert "hunt" not in message
+
+def test_compiled_deep_nesting():
+  t = String()
+  for _ in range(30):
+    t = Object(inner=Array(t).optional())
+  compiled = rigour.compile(t)
+  value = {}
+  for _ in range(30):
+    value = {"inner": [value] if value else ["leaf"]}
+  assert compiled.from_json(value) == rigour.from_json(t, value)
+
+def test_is_valid():
+  assert rigour.is_valid(Request, {"username": "svk", "password": "hunter2"})
+  assert not rigour.is_valid(Request, {"username": "x", "password": "hunter2"})
+  assert not rigour.is_valid(Request, {"username": 42, "password": "hunter2"})
+  assert not rigour.is_valid(Request, {"password": "hunter2"})
+  assert not rigour.is_valid(Request, {
+    "username": "svk",
+    "password": "hunter2",
+    "titles": ["Programmer", None],
+  })
+
+def test_validate_errors():
+  assert rigour.validate_errors(Request, {
+    "username": "svk",
+    "password": "hunter2",
+  }) == []
+  errors = rigour.validate_errors(Request, {
+    "username": "svk",
+    "password": "hunter2",
+    "name": {"given_name": "harald", "middle_name": ""},
+  })
+  messages = sorted(e.format() for e in errors)
+  assert len(messages) == 3
+  assert messages[0].startswith("name.given_name: expected string matching")
+  assert messages[1] == "name.middle_name: too short (0 is below threshold 1)"
+  assert messages[2] == "name: missing field 'family_name'"
+
+def test_validate_errors_secret():
+  t = Object(
+    card = Object(
+      number = String().constrain(length_between(16, 16)),
+      holder = String(),
+    ).secret(),
+  )
+  errors = rigour.validate_errors(t, {"card": {"number": "1234"}})
+  assert len(errors) == 2
+  for error in errors:
+    assert error.secret
+    assert "1234" not in error.format()
+
+def test_compiled_schema_does_not_keep_type_alive():
+  t = Array(Object(x=Integer()))
+  assert rigour.is_valid(t, [{"x": 1}])
+  assert rigour.compile(t) is rigour.compile(t)
+  ref = weakref.ref(t)
+  del t
+  gc.collect()
+  assert ref() is None
+
+def test_compiled_type_pickles():
+  t = Object(x=Integer())
+  rigour.compile(t)
+  u = pickle.loads(pickle.dumps(t))
+  assert "_compiled_schema" not in u.__dict__
+  assert rigour.compile(u).from_json({"x": 1}).x == 1
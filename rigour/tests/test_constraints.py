@@ -0,0 +1,94 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.types import *
+from rigour.constraints import *
+import rigour
+
+import pickle
+import pytest
+
+Username = String().constrain(length_between(1, 16),
+                              matches_regex(r"[a-z_]+"),
+                              length_between(1, 16))
+
+def test_params():
+  c = length_between(1, 16)
+  assert (c.min, c.max) == (1, 16)
+  assert c == LengthBetween(1, 16)
+  assert c != LengthBetween(1, 17)
+  assert matches_regex("a+")._compiled is matches_regex("a+")._compiled
+  assert repr(one_of("a", "b")) == "OneOf('a', 'b')"
+  assert pickle.loads(pickle.dumps(Username)) is not None
+
+def test_fused():
+  compiled = rigour.compile(Username)
+  assert "._valid(" not in compiled.source
+  # Once for each of the decoding and validating functions.
+  assert compiled.source.count("len(") == 2
+  assert compiled.is_valid("abc")
+  assert not compiled.is_valid("")
+  assert not compiled.is_valid("ABC")
+  with pytest.raises(ValidationFailed) as excinfo:
+    compiled.from_json("ABC")
+  assert "expected string matching '[a-z_]+'" in str(excinfo.value)
+
+def test_constraints():
+  cases = [
+    (Integer().constrain(number_between(0, 10)), [0, 10], [-1, 11]),
+    (Float().constrain(number_between(max_=1.5)), [-5.0, 1.5], [2.0]),
+    (String().constrain(has_prefix("ab"), has_suffix("yz")),
+     ["abyz", "ab-yz"], ["ayz", "abz"]),
+    (Any().constrain(one_of(1, "x")), [1, "x"], [2, "y", [1]]),
+    (Array(Any()).constrain(unique_items()),
+     [[1, 2], [{"a": 1}, {"a": 2}]], [[1, 1], [{"a": 1}, {"a": 1}]]),
+  ]
+  for t, good, bad in cases:
+    compiled = rigour.compile(t)
+    for value in good:
+      assert compiled.is_valid(value)
+      rigour.from_json(t, value)
+    for value in bad:
+      assert not compiled.is_valid(value)
+      with pytest.raises(ValidationFailed):
+        rigour.from_json(t, value)
+
+def test_plain_callables_still_work():
+  def even(x):
+    if x % 2:
+      raise ValidationFailed("expected even number")
+  t = Integer().constrain(number_between(0, 10), even)
+  assert rigour.is_valid(t, 4)
+  assert not rigour.is_valid(t, 3)
+  assert not rigour.is_valid(t, 12)
+  assert "even" in str(rigour.validate_errors(t, 3)[0])
+
+def test_wrong_types_fail():
+  cases = [
+    (Any().constrain(number_between(0, 10)), "x"),
+    (Any().constrain(has_prefix("a")), 3),
+    (Any().constrain(has_suffix("a")), [1]),
+    (Any().constrain(length_between(1, 2)), 3),
+  ]
+  for t, value in cases:
+    assert not rigour.is_valid(t, value)
+    with pytest.raises(ValidationFailed) as excinfo:
+      rigour.from_json(t, value)
+    assert "failed" in str(excinfo.value) or "expected" in str(excinfo.value)
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.from_json(Any().constrain(number_between(0, 10)), "x")
+  assert str(excinfo.value).startswith("failed NumberBetween(0, 10)")
@@ -0,0 +1,55 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.types import *
+from rigour.constraints import length_between
+from rigour import context
+import rigour
+
+import pytest
+
+Doc = Object(
+  rows = Array(FixArray(Integer(), String().constrain(length_between(1, 4)))),
+)
+
+def test_path_is_structured():
+  value = {"rows": [[1, "a"], [2, "b"], [3, "toolong"]]}
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.from_json(Doc, value)
+  assert excinfo.value.path == ("rows", 2, 1)
+  assert excinfo.value.show_context() == "rows[2][1]"
+
+def test_decode_error_path():
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.from_json(Doc, {"rows": [[1, "a"], [2, "b", 3]]})
+  assert excinfo.value.path == ("rows", 1)
+
+def test_context_managers():
+  with pytest.raises(ValidationFailed) as excinfo:
+    with context.member("a"):
+      with context.index("key"):
+        with context.index(0):
+          with context.contained_as("<x>"):
+            raise ValidationFailed("bad")
+  assert str(excinfo.value) == "a[key][0]<x>: bad"
+
+def test_flatten_keeps_paths():
+  t = Object(a=Object(b=Integer(), c=Integer()))
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.to_json(t, {"a": {"b": "x", "c": "y"}})
+  paths = sorted(e.path for e in excinfo.value.flatten())
+  assert paths == [("a", "b"), ("a", "c")]
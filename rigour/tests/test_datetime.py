@@ -0,0 +1,82 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.types import *
+from rigour.util import LRUCache
+from rigour import valuetypes
+import rigour
+
+import datetime
+import dateutil.parser
+import pytest
+
+def test_rfc3339_matches_dateutil():
+  for s in ["2015-08-20T01:58:42Z",
+            "2015-08-20T01:58:42.205677Z",
+            "2015-08-20T01:58:42.2+02:00",
+            "2015-08-20 01:58:42-0530",
+            "2015-08-20T01:58:42.123456+00:00"]:
+    expected = dateutil.parser.parse(s)
+    value = rigour.from_json(Datetime(), s)
+    assert value == expected
+    assert value.utcoffset() == expected.utcoffset()
+
+def test_repeated_strings_are_cached():
+  s = "2015-08-20T01:58:42.205677+01:00"
+  a = rigour.from_json(Datetime(), s)
+  b = rigour.from_json(Datetime(), s)
+  assert a is b
+  assert a.tzinfo is rigour.from_json(Datetime(), "2014-01-01T00:00:00+01:00").tzinfo
+
+def test_extra_digits_are_truncated():
+  value = rigour.from_json(Datetime(), "2015-08-20T01:58:42.123456789Z")
+  assert value.microsecond == 123456
+
+def test_fallback():
+  s = "2015-08-20T01:58:42.205677 UTC"
+  assert rigour.from_json(Datetime(), s) == dateutil.parser.parse(s)
+  with pytest.raises(ValidationFailed):
+    rigour.from_json(Datetime(fallback=False), s)
+  with pytest.raises(ValidationFailed):
+    rigour.from_json(Datetime(), "not a date")
+
+def test_invalid_fields_are_rejected():
+  for s in ["2015-02-30T00:00:00Z", "2015-08-20T25:00:00Z",
+            "2015-08-20T00:00:00+24:00"]:
+    with pytest.raises(ValidationFailed):
+      rigour.from_json(Datetime(fallback=False), s)
+
+def test_date():
+  assert rigour.from_json(Date(), "2015-08-20") == datetime.date(2015, 8, 20)
+  assert rigour.from_json(Date(), "2015-08-20") is (
+    rigour.from_json(Date(), "2015-08-20"))
+  with pytest.raises(ValidationFailed):
+    rigour.from_json(Date(), "2015-02-30")
+  with pytest.raises(ValidationFailed):
+    rigour.from_json(Date(), "20150820")
+
+def test_lru_cache():
+  cache = LRUCache(2)
+  cache.put("a", 1)
+  cache.put("b", 2)
+  assert cache.get("a") == 1
+  cache.put("c", 3)
+  assert "b" not in cache
+  assert cache.get("b") is None
+  assert len(cache) == 2
+  stats = cache.stats()
+  assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
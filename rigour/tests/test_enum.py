@@ -0,0 +1,74 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.types import *
+import rigour
+
+import array
+import pytest
+
+CODES = ["c{:03d}".format(i) for i in range(500)]
+
+def decoders(t):
+  return [lambda v: rigour.from_json(t, v), rigour.compile(t).from_json]
+
+def test_values_are_canonical():
+  t = StringEnum(*CODES)
+  for from_json in decoders(t):
+    value = from_json("".join(["c", "499"]))
+    assert value == "c499"
+    assert value is CODES[499]
+    with pytest.raises(ValidationFailed) as excinfo:
+      from_json("c500")
+    assert "expected one of" in str(excinfo.value)
+    assert "value was: 'c500'" in str(excinfo.value)
+    with pytest.raises(ValidationFailed):
+      from_json(["c001"])
+
+def test_ignore_case():
+  t = StringEnum("USD", "EUR", ignore_case=True)
+  for from_json in decoders(t):
+    assert from_json("usd") == "USD"
+    assert from_json("Eur") == "EUR"
+    with pytest.raises(ValidationFailed):
+      from_json("gbp")
+
+def test_codes():
+  t = Array(StringEnum("red", "green", "blue", codes=True))
+  for from_json in decoders(t):
+    assert from_json(["blue", "red"]) == [2, 0]
+  assert rigour.to_json(t, [1, 2]) == ["green", "blue"]
+  for code in (3, 1.0, True, "1"):
+    with pytest.raises(ValidationFailed):
+      rigour.to_json(t, [code])
+
+def test_columnar_codes():
+  t = Array(Object(colour=StringEnum("red", "green", codes=True))).columnar()
+  columns = rigour.from_json(t, [{"colour": "green"}, {"colour": "red"}])
+  assert columns.colour == array.array("B", [1, 0])
+  assert rigour.to_json(t, columns) == [{"colour": "green"}, {"colour": "red"}]
+
+def test_unknown_option():
+  with pytest.raises(ProgrammingError):
+    StringEnum("a", ignorecase=True)
+
+def test_missing_field():
+  for t in [StringEnum("a", "b"), StringEnum("a", "b", codes=True)]:
+    with pytest.raises(ValidationFailed) as excinfo:
+      rigour.from_json(Object(gender=t), {})
+    assert str(excinfo.value).startswith("missing field 'gender'")
+  assert rigour.from_json(Object(gender=t.optional()), {}).gender is None
@@ -0,0 +1,106 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.incremental import ArrayStream
+from rigour.types import *
+from rigour.constraints import length_between
+import rigour
+
+import io
+import json
+import pytest
+
+Item = Object(
+  id = Integer(),
+  name = String().constrain(length_between(1, 16)),
+  score = Float().optional(),
+)
+
+Batch = Object(
+  source = String(),
+  items = Array(Item),
+)
+
+def items(n):
+  return [{"id": i, "name": "item{}".format(i), "score": i * 12345.5}
+          for i in range(n)]
+
+def test_top_level_array():
+  data = json.dumps(items(100)).encode("utf-8")
+  for chunk_size in (1, 5, 1024):
+    values = list(ArrayStream(Array(Item), io.BytesIO(data),
+                              chunk_size=chunk_size))
+    assert [v.id for v in values] == list(range(100))
+    assert values[7].score == 7 * 12345.5
+
+def test_empty_array():
+  assert list(ArrayStream(Array(Item), io.StringIO(u" [ ] "))) == []
+
+def test_element_error_context():
+  values = items(3)
+  values[2]["name"] = ""
+  stream = iter(ArrayStream(Array(Item), io.StringIO(json.dumps(values))))
+  assert next(stream).id == 0
+  assert next(stream).id == 1
+  with pytest.raises(ValidationFailed) as excinfo:
+    next(stream)
+  assert str(excinfo.value).startswith("[2].name: too short")
+
+def test_object_field():
+  doc = {"source": "nightly", "items": items(10)}
+  stream = ArrayStream(Batch, io.StringIO(json.dumps(doc)), field="items",
+                       chunk_size=3)
+  assert [v.id for v in stream] == list(range(10))
+  assert stream.remainder.source == "nightly"
+
+def test_object_field_error_context():
+  doc = {"items": [{"id": "zero", "name": "x"}], "source": "nightly"}
+  stream = ArrayStream(Batch, io.StringIO(json.dumps(doc)), field="items")
+  with pytest.raises(ValidationFailed) as excinfo:
+    list(stream)
+  assert str(excinfo.value).startswith("items[0].id: expected integer")
+
+def test_truncated_document():
+  data = json.dumps(items(3))[:-10]
+  with pytest.raises(ValidationFailed) as excinfo:
+    list(ArrayStream(Array(Item), io.StringIO(data), chunk_size=4))
+  assert "invalid JSON" in str(excinfo.value)
+
+def test_malformed_element_fails_without_reading_on():
+  data = (u'[{"id": 0, "name": tru}, ' +
+          json.dumps(items(10000))[1:]).encode("utf-8")
+  fileobj = io.BytesIO(data)
+  with pytest.raises(ValidationFailed) as excinfo:
+    list(ArrayStream(Array(Item), fileobj, chunk_size=64))
+  assert "invalid JSON" in str(excinfo.value)
+  assert fileobj.tell() <= 128
+
+def test_secret_array_errors_are_elided():
+  t = Array(String().constrain(length_between(4, 8))).secret()
+  data = json.dumps(["abcd", "abc"])
+  with pytest.raises(ValidationFailed) as expected:
+    rigour.from_json(t, ["abcd", "abc"])
+  with pytest.raises(ValidationFailed) as excinfo:
+    list(ArrayStream(t, io.StringIO(data)))
+  assert str(excinfo.value) == str(expected.value)
+  assert "abc" not in str(excinfo.value)
+  doc = json.dumps({"source": "x", "items": ["abcd", "abc"]})
+  with pytest.raises(ValidationFailed) as excinfo:
+    list(ArrayStream(Object(source=String(), items=t), io.StringIO(doc),
+                     field="items"))
+  assert excinfo.value.path == ("items", 1)
+  assert "abc" not in str(excinfo.value)
@@ -0,0 +1,61 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.types import *
+from rigour.util import InternTable
+import rigour
+
+import json
+import pickle
+import pytest
+
+Row = Object(
+  country = String().interned(),
+  comment = String().interned(max_length=4),
+)
+
+ROWS = json.loads(json.dumps([{"country": "Norway", "comment": "long text"},
+                              {"country": "Norway", "comment": "long text"}]))
+
+def test_values_are_shared():
+  t = Array(Row)
+  for from_json in [lambda v: rigour.from_json(t, v),
+                    rigour.compile(t).from_json]:
+    a, b = from_json(ROWS)
+    assert a.country is b.country
+    assert a.comment == b.comment
+    assert a.comment is not b.comment
+
+def test_keys_are_shared():
+  t = Array(Row)
+  for from_json in [lambda v: rigour.from_json(t, v),
+                    rigour.compile(t).from_json]:
+    a, b = from_json(ROWS)
+    assert [k for k in a if k == "country"][0] is (
+      [k for k in b if k == "country"][0])
+
+def test_still_checked():
+  with pytest.raises(ValidationFailed):
+    rigour.from_json(Row, {"country": 1, "comment": "x"})
+
+def test_table_is_bounded():
+  table = InternTable(maxsize=2)
+  for s in ["a", "b", "c"]:
+    table.intern(s)
+  assert len(table) == 1
+  copy = pickle.loads(pickle.dumps(table))
+  assert (len(copy), copy.maxsize) == (0, 2)
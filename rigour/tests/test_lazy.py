@@ -0,0 +1,103 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.types import *
+from rigour.constraints import length_between
+import rigour
+
+import pickle
+import pytest
+
+Item = Object(
+  name = String().constrain(length_between(1, 8)),
+  tags = Array(String()).optional(),
+).lazy()
+
+Request = Object(
+  id = Integer(),
+  entries = Array(Item),
+  when = Datetime().optional(),
+).lazy()
+
+REQUEST = {
+  "id": 1,
+  "entries": [{"name": "a"}, {"name": "b", "tags": ["x"]}],
+  "when": "2015-08-20T01:58:42+00:00",
+}
+
+def test_fields_decoded_on_access():
+  val = rigour.from_json(Request, REQUEST)
+  assert set(val._pending()) == {"id", "entries", "when"}
+  assert val.id == 1
+  assert "id" not in val._pending()
+  assert val.entries[1].tags == ["x"]
+  assert val.entries is val.entries
+  assert val == rigour.from_json(Request, REQUEST)
+
+def test_shape_checked_upfront():
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.from_json(Request, {"id": 1, "entries": [], "extra": 2})
+  assert "unexpected field 'extra'" in str(excinfo.value)
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.from_json(Request, {"id": 1})
+  assert "missing field 'entries'" in str(excinfo.value)
+
+def test_errors_carry_full_path():
+  bad = dict(REQUEST, entries=[{"name": "a"}, {"name": "far too long"}])
+  val = rigour.from_json(Request, bad)
+  assert val.id == 1
+  entries = val.entries
+  assert entries[0].name == "a"
+  with pytest.raises(ValidationFailed) as excinfo:
+    entries[1].name
+  assert str(excinfo.value).startswith("entries[1].name: too long")
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.compile(Request).from_json(dict(REQUEST, id="x")).id
+  assert str(excinfo.value).startswith("id: ")
+
+def test_method_clash():
+  with pytest.raises(ProgrammingError):
+    Object(items=Array(String())).lazy()
+
+def test_lazy_within_eager_container():
+  t = Array(Item)
+  val = rigour.from_json(t, [{"name": "a"}, {"name": ""}])
+  with pytest.raises(ValidationFailed) as excinfo:
+    val[1].name
+  assert str(excinfo.value).startswith("[1].name: too short")
+
+def test_to_json_and_pickle():
+  val = rigour.from_json(Request, REQUEST)
+  assert rigour.to_json(Request, val) == REQUEST
+  copy = pickle.loads(pickle.dumps(val))
+  assert copy == val
+  assert copy.entries[0].name == "a"
+  val.id = "x"
+  with pytest.raises(ValidationFailed):
+    rigour.to_json(Request, val)
+
+def test_secret_fields_are_elided():
+  Card = Object(number=String().constrain(length_between(16, 19))).lazy()
+  value = {"card": {"number": "4111"}}
+  cards = [rigour.from_json(Object(card=Card.secret()), value).card,
+           rigour.from_json(Object(card=Card).secret(), value).card,
+           rigour.from_json(Array(Object(card=Card)).secret(), [value])[0].card]
+  for card in cards:
+    with pytest.raises(ValidationFailed) as excinfo:
+      card.number
+    assert "4111" not in str(excinfo.value)
+    assert excinfo.value.path[-2:] == ("card", "number")
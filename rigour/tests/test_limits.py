@@ -0,0 +1,93 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.constraints import length_between
+from rigour.errors import ValidationFailed
+from rigour.types import *
+import rigour
+
+import pytest
+
+Tag = String().constrain(length_between(1, 8))
+
+Post = Object(
+  title = String().constrain(length_between(1, 100)),
+  tags = Array(Tag).constrain(length_between(0, 10)),
+  kind = StringEnum("note", "article"),
+)
+
+def checked_calls():
+  calls = []
+  def checker(value):
+    calls.append(value)
+  return calls, checker
+
+def test_limits_apply_before_decoding():
+  calls, checker = checked_calls()
+  t = Array(String().constrain(checker))
+  limits = Limits(max_items=3)
+  assert rigour.from_json(t, ["a", "b"], limits) == ["a", "b"]
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(t, ["a"] * 1000, limits)
+  assert "too many elements" in str(e.value)
+  assert len(calls) == 2
+
+def test_each_limit():
+  value = {"a": [1, [2, 3]], "bb": "café"}
+  assert Limits(3, 2, 5, 2, 7).within(value)
+  assert not Limits(max_depth=1).within(value)
+  assert not Limits(max_items=1).within(value)
+  assert not Limits(max_string_bytes=4).within(value)
+  assert not Limits(max_fields=1).within(value)
+  assert not Limits(max_nodes=6).within(value)
+
+def test_path_of_failure():
+  limits = Limits(max_string_bytes=4)
+  with pytest.raises(ValidationFailed) as e:
+    limits.enforce({"a": [{"b": "ok"}, {"b": "too long"}]})
+  assert e.value.path == ("a", 1, "b")
+
+def test_derived():
+  limits = Limits.derived(Post)
+  assert limits.max_depth == 2
+  assert limits.max_items == 10
+  assert limits.max_string_bytes == 400
+  assert limits.max_fields == 3
+  assert limits.max_nodes == 1 + 1 + (1 + 10) + 1
+  unbounded = Limits.derived(Array(String()), max_items=50)
+  assert unbounded.max_items == 50
+  assert unbounded.max_string_bytes is None
+
+def test_limited_type():
+  t = Post.limited()
+  value = {"title": "Hello", "tags": ["a", "b"], "kind": "note"}
+  assert rigour.from_json(t, value).title == "Hello"
+  assert rigour.compile(t).from_json(value).tags == ["a", "b"]
+  hostile = dict(value, tags=["a"] * 100000)
+  assert not rigour.is_valid(t, hostile)
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(t, hostile)
+  assert e.value.path == ("tags",)
+  assert not rigour.is_valid(t, dict(value, title="x" * 1000))
+
+def test_limited_valid_input():
+  t = Array(String()).limited(Limits(max_items=2))
+  assert rigour.is_valid(t, ["a"])
+  assert rigour.compile(t).from_json(["a"]) == ["a"]
+  assert not rigour.is_valid(t, ["a", "b", "c"])
+  u = Object(names=t)
+  assert rigour.is_valid(u, {"names": ["a", "b"]})
+  assert rigour.compile(u).from_json({"names": ["a"]}).names == ["a"]
@@ -0,0 +1,85 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.constraints import length_between, matches_regex, number_between
+from rigour.errors import ValidationFailed
+from rigour.types import *
+import rigour
+
+import datetime
+import pytest
+
+UserId = String().constrain(matches_regex("u[0-9]+"))
+
+Counters = Map(UserId, Integer().constrain(number_between(0, None)))
+
+def test_leaf_map():
+  value = {"u{}".format(i): i for i in range(1000)}
+  assert Counters._leaf is not None
+  decoded = rigour.from_json(Counters, value)
+  assert decoded == value
+  assert rigour.to_json(Counters, decoded) == value
+  assert rigour.compile(Counters).from_json(value) == value
+
+def test_leaf_map_errors():
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(Counters, {"u1": 1, "u2": -1})
+  assert e.value.path == ("u2",)
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(Counters, {"u1": 1, "admin": 2})
+  assert e.value.path == ("admin",)
+  assert "invalid key" in str(e.value)
+  with pytest.raises(ValidationFailed):
+    rigour.from_json(Counters, [1, 2])
+
+def test_map_of_objects():
+  t = Map(StringEnum("on", "off", codes=True),
+          Object(since=Date(), note=String().optional()))
+  value = {"on": {"since": "2015-01-02"}, "off": {"since": "2015-03-04"}}
+  decoded = rigour.from_json(t, value)
+  assert t._leaf is None
+  assert decoded[0].since.month == 1
+  assert rigour.to_json(t, decoded) == value
+  decoded[1].note = 3
+  with pytest.raises(ValidationFailed) as e:
+    rigour.to_json(t, decoded)
+  assert e.value.path == ("off", "note")
+
+def test_map_error_paths_use_json_keys():
+  t = Map(Date(), Integer())
+  decoded = rigour.from_json(t, {"2015-01-02": 1})
+  decoded[datetime.date(2015, 1, 2)] = "x"
+  with pytest.raises(ValidationFailed) as e:
+    t.check(decoded)
+  assert e.value.path == ("2015-01-02",)
+  assert str(e.value).startswith("2015-01-02: ")
+  decoded = {"2015-01-02": 1}
+  with pytest.raises(ValidationFailed) as e:
+    t.check(decoded)
+  assert "invalid key" in str(e.value)
+
+def test_map_in_union():
+  t = Union(Map(String(), Integer()), Array(Integer()))
+  assert rigour.from_json(t, {"a": 1}) == {"a": 1}
+  assert rigour.from_json(t, [1]) == [1]
+
+def test_derived_limits():
+  t = Map(String().constrain(length_between(1, 4)),
+          Array(Integer())).constrain(length_between(0, 100))
+  limits = Limits.derived(t, max_items=10)
+  assert limits.max_fields == 100
+  assert limits.max_string_bytes == 16
+  assert limits.max_items == 10
@@ -0,0 +1,103 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.types import *
+from rigour.constraints import length_between
+import rigour
+
+import pickle
+import pytest
+
+Name = Object(
+  given = String().constrain(length_between(1, 16)),
+  family = String(),
+)
+
+def test_repeated_values_are_shared():
+  t = Array(Name.memoized())
+  value = [{"given": "Ada", "family": "Lovelace"},
+           {"family": "Lovelace", "given": "Ada"},
+           {"given": "Alan", "family": "Turing"}]
+  decoded = rigour.from_json(t, value)
+  assert decoded[0] is decoded[1]
+  assert decoded[2].family == "Turing"
+  stats = t._t.stats()
+  assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+  assert rigour.compile(t).from_json(value)[0] is decoded[0]
+
+def test_copies():
+  t = Name.memoized(copy=True)
+  a = rigour.from_json(t, {"given": "Ada", "family": "Lovelace"})
+  b = rigour.from_json(t, {"given": "Ada", "family": "Lovelace"})
+  assert a == b and a is not b
+  assert t.stats()["hits"] == 1
+
+def test_invalid_values_are_not_cached():
+  t = Name.memoized()
+  for _ in range(2):
+    with pytest.raises(ValidationFailed) as excinfo:
+      rigour.from_json(t, {"given": "", "family": "x"})
+    assert "given: too short" in str(excinfo.value)
+  assert t.stats()["size"] == 0
+
+def test_types_are_distinguished():
+  t = Array(Any().memoized())
+  decoded = rigour.from_json(t, [1, 1.0, True])
+  assert [type(x) for x in decoded] == [int, float, bool]
+
+def test_eviction():
+  t = Integer().memoized(maxsize=2)
+  for x in [1, 2, 3, 1]:
+    rigour.from_json(t, x)
+  assert t.stats()["evictions"] == 2
+
+def test_secrets_are_excluded():
+  with pytest.raises(ProgrammingError):
+    Object(password=String().secret()).memoized()
+  with pytest.raises(ProgrammingError):
+    Object(name=Name.memoized()).secret()
+
+def test_pickle_drops_cache():
+  t = pickle.loads(pickle.dumps(Name.memoized()))
+  assert t.stats()["size"] == 0
+  assert rigour.from_json(t, {"given": "Ada", "family": "L"}).given == "Ada"
+
+def test_changed_shared_values_are_checked():
+  t = Array(Name.memoized())
+  value = [{"given": "Ada", "family": "Lovelace"}] * 2
+  decoded = rigour.from_json(t, value)
+  assert rigour.to_json(t, decoded) == value
+  decoded[0].given = ""
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.to_json(t, decoded)
+  assert excinfo.value.path == (0, "given")
+
+def test_changed_values_are_not_served_again():
+  t = Name.memoized()
+  a = rigour.from_json(t, {"given": "Ada", "family": "Lovelace"})
+  a.given = "Mallory"
+  b = rigour.from_json(t, {"given": "Ada", "family": "Lovelace"})
+  assert b.given == "Ada" and b is not a
+  assert rigour.from_json(t, {"given": "Ada", "family": "Lovelace"}) is b
+  u = Object(names=Array(Name)).memoized()
+  value = {"names": [{"given": "Ada", "family": "Lovelace"}]}
+  c = rigour.from_json(u, value)
+  c.names[0].family = "Byron"
+  assert rigour.from_json(u, value).names[0].family == "Lovelace"
+  c = rigour.from_json(u, value)
+  c.names.append(c.names[0])
+  assert len(rigour.from_json(u, value).names) == 1
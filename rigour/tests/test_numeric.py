@@ -0,0 +1,82 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.types import *
+import rigour
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+Telemetry = Object(
+  samples = Array(Float()).numeric(finite=True),
+  track = Array(FixArray(Float(), Float())).numeric(minimum=-180, maximum=180),
+  counts = Array(Integer()).numeric().optional(),
+)
+
+def error_message(t, value):
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.from_json(t, value)
+  return str(excinfo.value)
+
+def test_numeric_decode():
+  val = rigour.from_json(Telemetry, {
+    "samples": [1.5, 2, 3.25],
+    "track": [[1, 2], [3.5, -4]],
+    "counts": [1, 2, 3],
+  })
+  assert val.samples.dtype == numpy.float64
+  assert val.samples.tolist() == [1.5, 2.0, 3.25]
+  assert val.track.shape == (2, 2)
+  assert val.counts.dtype == numpy.int64
+  assert rigour.to_json(Telemetry, val) == {
+    "samples": [1.5, 2.0, 3.25],
+    "track": [[1.0, 2.0], [3.5, -4.0]],
+    "counts": [1, 2, 3],
+  }
+
+def test_numeric_empty():
+  val = rigour.from_json(Telemetry, {"samples": [], "track": []})
+  assert val.samples.shape == (0,)
+  assert val.track.shape == (0, 2)
+
+def test_numeric_type_error_index():
+  message = error_message(Telemetry, {"samples": [1.0, "2"], "track": []})
+  assert message.startswith("samples[1]: expected floating-point")
+  message = error_message(Telemetry, {"samples": [], "track": [[1, 2], [3]]})
+  assert message.startswith("track[1]: expected 2 elements, got 1")
+  message = error_message(Telemetry, {
+    "samples": [], "track": [], "counts": [1, 2.5]})
+  assert message.startswith("counts[1]: expected integer")
+
+def test_numeric_bounds_error_index():
+  message = error_message(Telemetry, {
+    "samples": [1.0, 2.0, float("nan")], "track": []})
+  assert message.startswith("samples[2]: expected finite number")
+  message = error_message(Telemetry, {
+    "samples": [], "track": [[0, 0], [10, 200]]})
+  assert message.startswith("track[1][1]: exceeds maximum 180")
+
+def test_numeric_integer_overflow():
+  t = Array(Integer()).numeric()
+  assert "out of range" in error_message(t, [1, 2 ** 70])
+
+def test_numeric_check():
+  val = rigour.from_json(Telemetry, {"samples": [1.0], "track": [[1, 2]]})
+  val.samples = numpy.zeros((2, 2))
+  with pytest.raises(ValidationFailed):
+    rigour.to_json(Telemetry, val)
@@ -0,0 +1,61 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.types import *
+from rigour.constraints import length_between
+import rigour
+
+import pytest
+
+Point = Object(
+  x = Integer(),
+  y = Integer(),
+  label = String().constrain(length_between(1, 8)).optional(),
+)
+
+def test_accessor_class_is_shared():
+  a = rigour.from_json(Point, {"x": 1, "y": 2})
+  b = rigour.from_json(Point, {"x": 3, "y": 4})
+  assert type(a) is type(b)
+  assert isinstance(a, dict)
+
+def test_slotted_record():
+  t = Array(Point.slotted())
+  val = rigour.from_json(t, [{"x": 1, "y": 2}, {"x": 3, "y": 4, "label": "b"}])
+  assert val[0].x == 1
+  assert val[0].label is None
+  assert val[1]["label"] == "b"
+  assert not hasattr(val[0], "__dict__")
+  assert val[0] == {"x": 1, "y": 2, "label": None}
+  assert rigour.to_json(t, val) == [
+    {"x": 1, "y": 2},
+    {"x": 3, "y": 4, "label": "b"},
+  ]
+
+def test_slotted_record_checked():
+  t = Point.slotted()
+  val = rigour.from_json(t, {"x": 1, "y": 2})
+  val.label = ""
+  with pytest.raises(ValidationFailed) as excinfo:
+    rigour.to_json(t, val)
+  assert "label: too short" in str(excinfo.value)
+  with pytest.raises(AttributeError):
+    val.z = 3
+
+def test_slotted_record_method_clash():
+  with pytest.raises(ProgrammingError):
+    Object(items=Array(String())).slotted()
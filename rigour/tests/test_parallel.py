@@ -0,0 +1,110 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.containertypes import _checked_by
+from rigour.tests.schema import Request
+from rigour import parallel
+import rigour
+
+import json
+import pickle
+import pytest
+
+def requests(n):
+  rv = []
+  for i in range(n):
+    rv.append({
+      "username": "user{}".format(i) if i % 7 else "x",
+      "password": "hunter2",
+      "name": {"given_name": "Harald", "family_name": "Rex"},
+    })
+  return rv
+
+@pytest.fixture(scope="module")
+def pool():
+  p = parallel.multiprocessing.Pool(2)
+  yield p
+  p.terminate()
+  p.join()
+
+def test_schema_pickles():
+  t = pickle.loads(pickle.dumps(Request))
+  req = requests(2)[1]
+  assert rigour.from_json(t, req) == rigour.from_json(Request, req)
+  with pytest.raises(rigour.ValidationFailed) as excinfo:
+    rigour.from_json(t, requests(1)[0])
+  assert "too short" in str(excinfo.value)
+
+def test_value_pickles():
+  val = rigour.from_json(Request, requests(2)[1])
+  copy = pickle.loads(pickle.dumps(val))
+  assert copy == val
+  assert copy.name.family_name == "Rex"
+  assert rigour.to_json(Request, copy) == requests(2)[1]
+
+def test_from_json_many(pool):
+  reqs = requests(50)
+  expected = rigour.from_json_many(Request, reqs)
+  result = parallel.from_json_many(Request, reqs, pool=pool, chunk_size=7)
+  assert result.values == expected.values
+  assert [i for (i, e) in result.errors] == [i for (i, e) in expected.errors]
+  assert [str(e) for (i, e) in result.errors] == [
+    str(e) for (i, e) in expected.errors]
+
+def test_values_are_bound_to_the_callers_type(pool):
+  result = parallel.from_json_many(Request, requests(20), pool=pool,
+                                   chunk_size=3)
+  values = [v for v in result.values if v is not None]
+  assert len(set(type(v) for v in values)) == 1
+  for v in values:
+    assert v._object is Request
+    assert _checked_by(v) is Request
+    assert _checked_by(v.name) is Request._fields["name"]._t
+  values[0].username = "x"
+  with pytest.raises(rigour.ValidationFailed):
+    rigour.to_json(Request, values[0])
+
+def test_non_objects(tmpdir, pool):
+  reqs = [None, 42, "svk"] + requests(3)
+  result = parallel.from_json_many(Request, reqs, pool=pool, chunk_size=2)
+  assert [i for (i, e) in result.errors] == [0, 1, 2, 3]
+  path = tmpdir.join("data.ndjson")
+  path.write("\n".join(json.dumps(r) for r in reqs) + "\n")
+  errors = []
+  values = list(parallel.iter_ndjson(Request, str(path), errors, pool=pool,
+                                     chunk_bytes=20))
+  assert [v.username for v in values] == ["user1", "user2"]
+  assert [n for (n, e) in errors] == [1, 2, 3, 4]
+  assert "expected Object" in str(errors[1][1])
+
+def test_ndjson(tmpdir, pool):
+  lines = [json.dumps(r) for r in requests(40)]
+  lines[5] = "{oops"
+  lines[9] = ""
+  path = tmpdir.join("data.ndjson")
+  path.write("\n".join(lines) + "\n")
+  expected_errors = []
+  expected = list(rigour.stream.iter_ndjson(Request, str(path),
+                                            expected_errors))
+  errors = []
+  values = list(parallel.iter_ndjson(Request, str(path), errors, pool=pool,
+                                     chunk_bytes=100))
+  assert values == expected
+  assert [n for (n, e) in errors] == [n for (n, e) in expected_errors]
+  valid, errors = parallel.validate_ndjson(Request, str(path), pool=pool,
+                                           chunk_bytes=100)
+  assert valid == len(expected)
+  assert [n for (n, e) in errors] == [n for (n, e) in expected_errors]
@@ -0,0 +1,97 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.profiling import Profiler
+from rigour.types import *
+from rigour import serializer
+import rigour
+
+import pytest
+
+def nonempty(s):
+  if not s:
+    raise ValidationFailed("empty")
+
+Person = Object(
+  name = String().constrain(nonempty),
+  born = Date(),
+  titles = Array(String()).optional(),
+  position = FixArray(Float(), Float()),
+)
+
+VALUE = {
+  "name": "Ada",
+  "born": "1815-12-10",
+  "titles": ["Countess", "Lady"],
+  "position": [51.5, -0.1],
+}
+
+def by_key(profiler):
+  return {(entry["path"], entry["type"], entry["operation"]): entry
+          for entry in profiler.stats()}
+
+def test_counts_by_path():
+  t = Array(Person)
+  with Profiler(t) as profiler:
+    rigour.from_json(t, [VALUE, VALUE, VALUE])
+  stats = by_key(profiler)
+  assert stats[("", "Array", "from_json")]["calls"] == 1
+  assert stats[("[]", "Object", "from_json")]["calls"] == 3
+  assert stats[("[].titles[]", "String", "from_json")]["calls"] == 6
+  assert stats[("[].position[1]", "Float", "check")]["calls"] == 3
+  assert stats[("[].name", "nonempty", "checker")]["calls"] == 3
+  root = stats[("", "Array", "from_json")]
+  assert root["self"] <= root["cumulative"]
+
+def test_errors_are_still_counted():
+  with Profiler(Person) as profiler:
+    with pytest.raises(ValidationFailed):
+      rigour.from_json(Person, dict(VALUE, name=""))
+  assert by_key(profiler)[("name", "nonempty", "checker")]["calls"] == 1
+
+def test_hooks_are_removed():
+  with Profiler(Person) as profiler:
+    rigour.to_json(Person, rigour.from_json(Person, VALUE))
+  calls = dict((key, entry["calls"]) for key, entry in
+               profiler.as_dict().items())
+  assert calls["born:Date.to_json"] == 1
+  for t in (Person, Person._fields["name"], Person._fields["born"]):
+    assert not set(t.__dict__) & set(["from_json", "check", "to_json"])
+  assert Person._fields["name"]._checkers == (nonempty,)
+  rigour.from_json(Person, VALUE)
+  assert calls == dict((key, entry["calls"]) for key, entry in
+                       profiler.as_dict().items())
+
+def test_shared_types():
+  s = String()
+  t = Object(a=s, b=s)
+  with Profiler(t) as profiler:
+    rigour.from_json(t, {"a": "x", "b": "y"})
+  assert by_key(profiler)[("*", "String", "from_json")]["calls"] == 2
+  assert "<root>: Object.from_json" in profiler.report()
+
+def test_nothing_built_within_the_block_keeps_the_hooks():
+  t = Array(Person)
+  with Profiler(t) as profiler:
+    assert rigour.is_valid(t, [VALUE])
+    serializer.dumps(t, rigour.from_json(t, [VALUE]))
+  calls = profiler.as_dict()
+  for _ in range(10):
+    assert rigour.is_valid(t, [VALUE])
+    serializer.dumps(t, rigour.from_json(t, [VALUE]))
+  assert profiler.as_dict() == calls
+  assert "_compiled_schema" in t.__dict__
@@ -0,0 +1,87 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.types import *
+from rigour.constraints import length_between
+from rigour import serializer
+import rigour
+
+import gc
+import io
+import json
+import pytest
+import weakref
+
+Entry = Object(
+  name = String().constrain(length_between(1, 32)),
+  kind = StringEnum("a", "b", codes=True),
+  score = Float().optional(),
+  count = Integer(),
+  flags = FixArray(Integer(), Any()),
+  day = Date().optional(),
+)
+
+Export = Object(
+  title = String(),
+  entries = Array(Entry),
+  extra = Any().optional(),
+)
+
+VALUE = {
+  "title": u"résumé \"quoted\"",
+  "entries": [
+    {"name": "x", "kind": "b", "score": 1.5, "count": 3,
+     "flags": [1, {"k": [True, None]}], "day": "2015-08-20"},
+    {"name": "y", "kind": "a", "count": -7, "flags": [0, 1e100]},
+  ] * 50,
+  "extra": {"nan": float("nan")},
+}
+
+def test_matches_json_dumps():
+  value = rigour.from_json(Export, VALUE)
+  expected = json.dumps(rigour.to_json(Export, value))
+  assert serializer.dumps(Export, value) == expected
+  assert "".join(serializer.iter_dumps(Export, value)) == expected
+
+def test_chunks():
+  value = rigour.from_json(Export, VALUE)
+  chunks = list(serializer.iter_dumps(Export, value, chunk_size=64))
+  assert len(chunks) > 10
+  text = io.StringIO()
+  serializer.dump(Export, value, text, chunk_size=64)
+  data = io.BytesIO()
+  serializer.dump(Export, value, data)
+  assert json.loads(text.getvalue()) == json.loads(data.getvalue().decode())
+
+def test_empty_and_null():
+  t = Object(a=Integer().optional(), b=Array(String()))
+  assert serializer.dumps(t, rigour.from_json(t, {"b": []})) == '{"b": []}'
+  assert serializer.dumps(t.optional(), None) == "null"
+
+def test_checked_first():
+  value = rigour.from_json(Export, VALUE)
+  value.entries[1].name = ""
+  with pytest.raises(ValidationFailed):
+    list(serializer.iter_dumps(Export, value))
+
+def test_encoder_does_not_keep_type_alive():
+  t = Array(Object(x=Integer()))
+  assert serializer.dumps(t, rigour.from_json(t, [{"x": 1}])) == '[{"x": 1}]'
+  ref = weakref.ref(t)
+  del t
+  gc.collect()
+  assert ref() is None
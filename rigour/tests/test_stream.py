@@ -0,0 +1,64 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.tests.schema import Request
+from rigour import stream
+
+import json
+
+LINES = [
+  json.dumps({"username": "svk", "password": "hunter2"}),
+  json.dumps({"username": "x", "password": "hunter2"}),
+  "",
+  json.dumps({"username": "buffy", "password": "slayer", "titles": ["a"]}),
+  "{not json",
+  json.dumps({"username": "harald", "password": "Rex999"}),
+]
+
+def write_lines(tmpdir, lines):
+  path = tmpdir.join("data.ndjson")
+  path.write("\n".join(lines) + "\n")
+  return str(path)
+
+def test_iter_ndjson(tmpdir):
+  path = write_lines(tmpdir, LINES)
+  for chunk_size in (1, 7, 64, stream.DEFAULT_CHUNK_SIZE):
+    errors = []
+    values = list(stream.iter_ndjson(Request, path, errors, chunk_size))
+    assert [v.username for v in values] == ["svk", "buffy", "harald"]
+    assert [n for (n, e) in errors] == [2, 5]
+    assert "username: too short" in str(errors[0][1])
+    assert "invalid JSON" in str(errors[1][1])
+
+def test_iter_ndjson_empty(tmpdir):
+  path = tmpdir.join("empty.ndjson")
+  path.write("")
+  assert list(stream.iter_ndjson(Request, str(path))) == []
+
+def test_iter_ndjson_non_objects(tmpdir):
+  path = write_lines(tmpdir, ["null", "42", '"svk"', "[]", LINES[0]])
+  errors = []
+  values = list(stream.iter_ndjson(Request, path, errors))
+  assert [v.username for v in values] == ["svk"]
+  assert [n for (n, e) in errors] == [1, 2, 3, 4]
+  assert "expected Object" in str(errors[1][1])
+
+def test_main(tmpdir, capsys):
+  path = write_lines(tmpdir, LINES)
+  assert stream.main(["rigour.tests.schema:Request", path]) == 1
+  out, err = capsys.readouterr()
+  assert "valid: 3, invalid: 2" in out
+  assert "line 2: username: too short" in err
@@ -0,0 +1,134 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ValidationFailed
+from rigour.types import *
+from rigour.constraints import length_between
+import rigour
+
+import pytest
+
+calls = []
+
+def counted(value):
+  calls.append(value)
+
+Person = Object(
+  name = String().constrain(counted, length_between(1, 8)),
+  tags = Array(String()).optional(),
+)
+
+Team = Object(
+  lead = Person,
+  members = Array(Person),
+)
+
+TEAM = {
+  "lead": {"name": "ada"},
+  "members": [{"name": "alan", "tags": ["x"]}, {"name": "grace"}],
+}
+
+def decoders():
+  return [lambda v: rigour.from_json(Team, v), rigour.compile(Team).from_json]
+
+def test_round_trip_skips_checked_fields():
+  for from_json in decoders():
+    value = from_json(TEAM)
+    del calls[:]
+    assert rigour.to_json(Team, value) == TEAM
+    assert calls == []
+
+def test_assignment_is_checked():
+  for from_json in decoders():
+    value = from_json(TEAM)
+    value.members[1].name = "x" * 9
+    with pytest.raises(ValidationFailed) as excinfo:
+      rigour.to_json(Team, value)
+    assert str(excinfo.value).startswith("members[1].name: too long")
+    value.members[1]["name"] = "grace"
+    del calls[:]
+    rigour.to_json(Team, value)
+    assert calls == ["grace"]
+
+def test_mutable_fields_are_checked():
+  for from_json in decoders():
+    value = from_json(TEAM)
+    value.members[0].tags.append(3)
+    with pytest.raises(ValidationFailed):
+      rigour.to_json(Team, value)
+    value = from_json(TEAM)
+    value.members.append({"name": ""})
+    with pytest.raises(ValidationFailed):
+      rigour.to_json(Team, value)
+
+def test_dict_methods_invalidate():
+  value = rigour.from_json(Person, {"name": "ada"})
+  value.update(name="")
+  with pytest.raises(ValidationFailed):
+    rigour.to_json(Person, value)
+  t = Person.slotted()
+  value = rigour.from_json(t, {"name": "ada"})
+  rigour.to_json(t, value)
+  value.name = ""
+  with pytest.raises(ValidationFailed):
+    rigour.to_json(t, value)
+
+def test_only_dirty_fields_are_checked():
+  t = Object(a=String().constrain(counted), b=String().constrain(counted),
+             c=String().constrain(counted))
+  for from_json in [lambda v: rigour.from_json(t, v),
+                    rigour.compile(t).from_json]:
+    value = from_json({"a": "1", "b": "2", "c": "3"})
+    value.b = "4"
+    del calls[:]
+    t.check(value)
+    assert calls == ["4"]
+    del calls[:]
+    t.check(value)
+    assert calls == []
+
+def test_unchanged_lists_are_skipped():
+  t = Array(String().constrain(counted))
+  for from_json in [lambda v: rigour.from_json(t, v),
+                    rigour.compile(t).from_json]:
+    value = from_json(["a", "b"])
+    assert isinstance(value, TrackedList)
+    del calls[:]
+    t.check(value)
+    assert calls == []
+    value.append("c")
+    t.check(value)
+    assert calls == ["a", "b", "c"]
+    value[0] = 1
+    with pytest.raises(ValidationFailed):
+      t.check(value)
+    value.sort(key=str)
+    with pytest.raises(ValidationFailed):
+      t.check(value)
+
+def test_tracked_list_pickles_as_list():
+  import pickle
+  t = Array(Integer())
+  value = rigour.from_json(t, [1, 2])
+  copy = pickle.loads(pickle.dumps(value))
+  assert copy == [1, 2]
+  # Still marked, but by the copy of the type pickled along with it.
+  assert getattr(copy, "_checked", None) is not None
+  assert getattr(copy, "_checked", None) is not t
+  t2, copy = pickle.loads(pickle.dumps((t, value)))
+  assert getattr(copy, "_checked", None) is t2
+  copy.append("x")
+  assert getattr(copy, "_checked", None) is None
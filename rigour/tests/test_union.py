@@ -0,0 +1,94 @@
+# Copyright 2015 Google Inc.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#      http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+from rigour.errors import ProgrammingError, ValidationFailed
+from rigour.types import *
+import rigour
+
+import datetime
+import pytest
+
+Event = TaggedUnion("type", {
+  "click": Object(type=String(), x=Integer(), y=Integer()),
+  "key": Object(type=String(), code=String(), repeat=Integer().optional()),
+})
+
+CLICK = {"type": "click", "x": 1, "y": 2}
+KEY = {"type": "key", "code": "Enter"}
+
+def test_tagged_union_dispatch():
+  t = Array(Event)
+  events = rigour.from_json(t, [CLICK, KEY])
+  assert events[0].x == 1
+  assert events[1].code == "Enter"
+  assert rigour.to_json(t, events) == [CLICK, KEY]
+  assert rigour.compile(t).from_json([CLICK, KEY]) == events
+  assert rigour.compile(t).is_valid([KEY, CLICK])
+  assert not rigour.compile(t).is_valid([dict(KEY, repeat="x")])
+
+def test_tagged_union_errors_name_the_variant():
+  t = Array(Event)
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(t, [CLICK, dict(CLICK, y="up")])
+  assert e.value.show_context() == "[1]<type=click>.y"
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(t, [{"type": "scroll"}])
+  assert "unknown type 'scroll'" in str(e.value)
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(Event, {"x": 1})
+  assert "missing field 'type'" in str(e.value)
+  events = rigour.from_json(t, [KEY])
+  events[0].code = 13
+  with pytest.raises(ValidationFailed) as e:
+    rigour.to_json(t, events)
+  assert e.value.show_context() == "[0]<type=key>.code"
+
+def test_tagged_union_variants_need_the_tag():
+  with pytest.raises(ProgrammingError):
+    TaggedUnion("type", {"a": Object(x=Integer())})
+
+def test_union_dispatches_on_json_type():
+  t = Union(Integer(), Float(), String(), Array(Integer()), Event)
+  values = [1, 1.5, "a", [1, 2], CLICK]
+  decoded = rigour.from_json(Array(t), values)
+  assert decoded[4].y == 2
+  assert rigour.to_json(Array(t), decoded) == values
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(t, [1, "a"])
+  assert e.value.show_context() == "<[integer..]>[1]"
+  with pytest.raises(ValidationFailed):
+    rigour.from_json(t, None)
+
+def test_union_decoded_classes():
+  t = Union(Float(), Date())
+  assert rigour.from_json(t, 2) == 2
+  assert rigour.from_json(t, "2015-01-02") == datetime.date(2015, 1, 2)
+  t.check(datetime.date(2015, 1, 2))
+  with pytest.raises(ValidationFailed):
+    rigour.from_json(t, [])
+
+def test_ambiguous_union():
+  with pytest.raises(ProgrammingError):
+    Union(String(), Datetime())
+  with pytest.raises(ProgrammingError):
+    Union(Object(a=Integer()), Object(b=Integer()))
+
+def test_unknown_tag_of_mixed_keys():
+  t = TaggedUnion("kind", {"a": Object(kind=String()),
+                           1: Object(kind=Integer())})
+  with pytest.raises(ValidationFailed) as e:
+    rigour.from_json(t, {"kind": "b"})
+  assert "expected one of: a, 1" in str(e.value)
@@ -17,3 +17,6 @@ from __future__ import absolute_import
 from rigour.basetypes import *
 from rigour.containertypes import *
 from rigour.valuetypes import *
+from rigour.numerictypes import *
+from rigour.columnar import *
+from rigour.limits import *
@@ -16,6 +16,9 @@ from __future__ import absolute_import
 
 from rigour.errors import ProgrammingError, ValidationFailed
 
+import collections
+import inspect
+
 def run_check(f, value):
   """Runs a check on a value.
 
@@ -33,8 +36,18 @@ def run_check(f, value):
       e.value = value
     raise
   if rv is not None:
-    message = "checker {} should not be returning a value, but returned {}"
-    raise ProgrammingError(message.format(f, rv))
+    _returned(f, rv)
+
+_iscoroutine = getattr(inspect, "iscoroutine", lambda value: False)
+
+def _returned(f, rv):
+  """Raises the error for a checker that returned `rv` instead of None."""
+  if _iscoroutine(rv):
+    rv.close()
+    message = "checker {} is asynchronous, and can only be run by rigour.aio"
+    raise ProgrammingError(message.format(f))
+  message = "checker {} should not be returning a value, but returned {}"
+  raise ProgrammingError(message.format(f, rv))
 
 def assert_type(t):
   """Verifies that a variable is a JsonType.
@@ -44,3 +57,91 @@ def assert_type(t):
   """
   if not isinstance(t, JsonType):
     raise ProgrammingError("expected {} to be a JsonType")
+
+class LRUCache(object):
+  """A mapping of bounded size that evicts the least recently used entry.
+
+  Keeps counts of hits, misses and evictions, available from `stats`.
+  """
+
+  def __init__(self, maxsize):
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self._data = collections.OrderedDict()
+
+  def get(self, key, default=None):
+    try:
+      value = self._data.pop(key)
+    except KeyError:
+      self.misses += 1
+      return default
+    self._data[key] = value
+    self.hits += 1
+    return value
+
+  def put(self, key, value):
+    self._data.pop(key, None)
+    self._data[key] = value
+    while len(self._data) > self.maxsize:
+      try:
+        self._data.popitem(last=False)
+      except KeyError:
+        break
+      self.evictions += 1
+
+  def clear(self):
+    self._data.clear()
+
+  def __len__(self):
+    return len(self._data)
+
+  def __contains__(self, key):
+    return key in self._data
+
+  def stats(self):
+    return {
+      "size": len(self._data),
+      "maxsize": self.maxsize,
+      "hits": self.hits,
+      "misses": self.misses,
+      "evictions": self.evictions,
+    }
+
+class InternTable(object):
+  """A bounded table of canonical copies of strings.
+
+  `intern` returns the copy held in the table for a string equal to the
+  one given, so that equal strings decoded from many values share one
+  object. Only strings of at most `max_length` are held, and the table
+  is emptied when it reaches `maxsize` entries, so that it follows the
+  data rather than keeping the strings of the first values forever.
+  """
+
+  def __init__(self, maxsize=1 << 16, max_length=64):
+    self.maxsize = maxsize
+    self.max_length = max_length
+    self._table = {}
+
+  def intern(self, s):
+    rv = self._table.get(s)
+    if rv is not None:
+      return rv
+    if len(s) <= self.max_length:
+      if len(self._table) >= self.maxsize:
+        self._table.clear()
+      self._table[s] = s
+    return s
+
+  def clear(self):
+    self._table.clear()
+
+  def __len__(self):
+    return len(self._table)
+
+  def __getstate__(self):
+    return {"maxsize": self.maxsize, "max_length": self.max_length}
+
+  def __setstate__(self, state):
+    self.__init__(state["maxsize"], state["max_length"])
@@ -14,14 +14,21 @@
 
 from __future__ import absolute_import
 
-from rigour.errors import ValidationFailed
+from rigour.errors import ProgrammingError, ValidationFailed
 from rigour.basetypes import JsonType
+from rigour.util import InternTable, LRUCache
 
 import dateutil.parser
+import dateutil.tz
 import datetime
 import re
 import sys
 
+if sys.version_info.major == 2:
+  _string_types = (unicode, str)
+else:
+  _string_types = (str,)
+
 class _SimpleType(JsonType):
   def __init__(self, python_type, type_name=None):
     self._python_type = python_type
@@ -42,11 +49,24 @@ class _SimpleType(JsonType):
 
 class String(_SimpleType):
   def __init__(self):
-    if sys.version_info.major == 2:
-      types = (unicode, str)
-    else:
-      types = (str,)
-    _SimpleType.__init__(self, types, "string")
+    _SimpleType.__init__(self, _string_types, "string")
+    self._interned = None
+
+  def interned(self, max_length=64, maxsize=1 << 16):
+    """Returns a copy of this type that interns the strings it decodes.
+
+    Equal strings of at most `max_length` characters decode to a shared
+    object, held in a table of at most `maxsize` entries. This saves
+    memory when many decoded values repeat the same short strings.
+    """
+    rv = String()
+    rv._interned = InternTable(maxsize, max_length)
+    return rv
+
+  def _from_json(self, value):
+    if self._interned is not None and isinstance(value, _string_types):
+      return self._interned.intern(value)
+    return value
 
 class Integer(_SimpleType):
   def __init__(self):
@@ -65,23 +85,129 @@ class Float(_SimpleType):
     _SimpleType.__init__(self, types, "floating-point")
 
 class StringEnum(JsonType):
-  def __init__(self, *choices):
+  """One of a fixed set of strings.
+
+  Choices are looked up in a hash table, and decode to the schema's own
+  copy of the string, so that equal values share one object. Options:
+
+  ignore_case: also accept the choices in any case, decoding to the
+    spelling given in the schema.
+  codes: decode to the index of the choice instead of the string. Small
+    integers take less memory in large arrays, and encode back to the
+    string.
+  """
+
+  def __init__(self, *choices, **options):
+    unknown = set(options) - set(["ignore_case", "codes"])
+    if unknown:
+      message = "unknown StringEnum options: {}".format(", ".join(unknown))
+      raise ProgrammingError(message)
     self._choices = choices
+    self._ignore_case = options.get("ignore_case", False)
+    self._codes = options.get("codes", False)
+    if self._codes:
+      decoded = range(len(choices))
+    else:
+      decoded = choices
+    self._index = dict(zip(choices, decoded))
+    self._decoded = frozenset(decoded)
+    self._folded = {}
+    if self._ignore_case:
+      for choice, value in zip(reversed(choices), reversed(decoded)):
+        self._folded[choice.lower()] = value
 
   def _name(self, depth):
     return "{" + " | ".join(self._choices) + "}"
 
+  def _fail(self, value):
+    raise ValidationFailed("expected one of: {}".format(self._choices),
+                           value=value)
+
   def _check(self, value):
-    if value not in self._choices:
-      raise ValidationFailed("expected one of: {}".format(self._choices))
+    if self._codes:
+      valid_type = type(value) is int
+    else:
+      valid_type = isinstance(value, _string_types)
+    try:
+      if valid_type and value in self._decoded:
+        return
+    except TypeError:
+      pass
+    self._fail(value)
 
   def _from_json(self, value):
-    return value
+    if value is None:
+      # Left for the check to report as missing.
+      return None
+    try:
+      return self._index[value]
+    except (KeyError, TypeError):
+      pass
+    if self._ignore_case and isinstance(value, _string_types):
+      rv = self._folded.get(value.lower())
+      if rv is not None:
+        return rv
+    self._fail(value)
 
   def _to_json(self, value):
+    if self._codes:
+      return self._choices[value]
     return value
 
+# RFC 3339 and the common ISO 8601 shapes close to it.
+_datetime_pattern = re.compile(
+  r"(\d{4})-(\d{2})-(\d{2})[Tt ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6})\d*)?"
+  r"(?:([Zz])|([+-])(\d{2}):?(\d{2}))?$")
+
+# Parsed values are immutable, so repeated strings share one.
+_datetime_cache = LRUCache(4096)
+_date_cache = LRUCache(4096)
+_timezone_cache = LRUCache(256)
+
+def _timezone(sign, hours, minutes):
+  key = (sign, hours, minutes)
+  rv = _timezone_cache.get(key)
+  if rv is None:
+    offset = 60 * (60 * int(hours) + int(minutes))
+    if offset == 0:
+      rv = dateutil.tz.tzutc()
+    else:
+      rv = dateutil.tz.tzoffset(None, -offset if sign == "-" else offset)
+    _timezone_cache.put(key, rv)
+  return rv
+
+def _parse_datetime(s):
+  """Parses the common ISO 8601 shapes, returning None for others."""
+  m = _datetime_pattern.match(s)
+  if not m:
+    return None
+  (year, month, day, hour, minute, second, fraction, utc,
+   sign, tz_hours, tz_minutes) = m.groups()
+  tzinfo = None
+  if utc:
+    tzinfo = dateutil.tz.tzutc()
+  elif sign:
+    if int(tz_hours) >= 24 or int(tz_minutes) >= 60:
+      return None
+    tzinfo = _timezone(sign, tz_hours, tz_minutes)
+  microsecond = int(fraction.ljust(6, "0")) if fraction else 0
+  try:
+    return datetime.datetime(int(year), int(month), int(day), int(hour),
+                             int(minute), int(second), microsecond, tzinfo)
+  except ValueError:
+    return None
+
 class Datetime(JsonType):
+  """A date and time, represented in JSON as a string.
+
+  Strings in the common ISO 8601 shapes, including RFC 3339, are parsed
+  directly and repeated ones are served from a cache. Other strings are
+  handed to `dateutil.parser` unless `fallback` is false.
+  """
+
+  def __init__(self, fallback=True):
+    self._fallback = fallback
+
   def _name(self, depth):
     return "datetime"
 
@@ -95,10 +221,21 @@ class Datetime(JsonType):
     return value.isoformat()
 
   def _from_json(self, json_string):
+    if isinstance(json_string, _string_types):
+      rv = _datetime_cache.get(json_string)
+      if rv is not None:
+        return rv
+      rv = _parse_datetime(json_string)
+      if rv is not None:
+        _datetime_cache.put(json_string, rv)
+        return rv
+      if not self._fallback:
+        message = "failed to parse datetime: expected ISO 8601 format"
+        raise ValidationFailed(message, value=json_string)
     try:
       return dateutil.parser.parse(json_string)
     except ValueError as e:
-      message = "failed to parse datetime: {}".format(e.message)
+      message = "failed to parse datetime: {}".format(e)
       raise ValidationFailed(message, value=json_string)
 
 class Date(JsonType):
@@ -115,6 +252,10 @@ class Date(JsonType):
     return value.isoformat()
 
   def _from_json(self, json_string):
+    if isinstance(json_string, _string_types):
+      rv = _date_cache.get(json_string)
+      if rv is not None:
+        return rv
     m = Date._date_pattern.match(json_string)
     if not m:
       raise ValidationFailed("expected date of format YYYY-MM-DD")
@@ -122,9 +263,11 @@ class Date(JsonType):
     month = int(m.group("month"))
     day = int(m.group("day"))
     try:
-      return datetime.date(year, month, day)
+      rv = datetime.date(year, month, day)
     except ValueError as e:
-      raise ValidationError(e.message)
+      raise ValidationFailed(str(e))
+    _date_cache.put(json_string, rv)
+    return rv
 
 class Any(JsonType):
   def __name(self, depth):